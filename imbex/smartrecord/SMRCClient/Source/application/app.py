@@ -14,8 +14,10 @@ from traitsui.api import Handler, View, UItem, Image
 sys.path.append(dirname(dirname(abspath('app.py'))))
 
 from basic_modules.basic_classes import RunThread
+from basic_modules.basic_dialogs import InfoDialogs
 from basic_modules.basic_methods import \
     create_dir, clear_temp_folder, create_logger
+from experiment.recorder.recording.journal import recover_journal
 
 
 class Application(object):
@@ -24,18 +26,32 @@ class Application(object):
     automatically and evaluate the experiment with ncorr.  
     """
 
-    # Creates the directories to save the configuration
-    # of the application.
-    create_dir()
+    def __init__(self):
+        # The startup is done here and not in the class body, because the
+        # worker processes of a pool (see resize_images) import the
+        # main-module again on windows.
 
-    # Clear the whole temp-folder
-    clear_temp_folder()
+        # Creates the directories to save the configuration
+        # of the application.
+        create_dir()
 
-    # Creates the logger 'application' to save all actions of
-    # the application.
-    logger = create_logger("Application")
+        # Creates the logger 'application' to save all actions of
+        # the application.
+        self.logger = create_logger("Application")
+
+        # Recovers the recordings of a journal which were not saved
+        # (e.g. after a crash of the application). The recovery needs
+        # the files of the last session in the temp-folder.
+        project = recover_journal()
+
+        # Clear the whole temp-folder
+        clear_temp_folder()
+
+        if project is not None:
+            InfoDialogs().open_info(
+                "The unsaved recordings of the last session were "
+                "recovered. Load the project {0}".format(project))
 
-    def __init__(self):
         start_dialog = StartDialog(self)
         start_dialog.show(self.initialize)
 
@@ -35,10 +35,21 @@ storage_temp_dir = abspath(join(confdir, "storage_temp"))
 
 server_dir = abspath(join(confdir, "server"))
 
+measuring_card_dir = abspath(join(confdir, "measuring_card"))
+
 log_dir = abspath(join(confdir, "logs"))
 
 backup_dir = abspath(join(confdir, "backup"))
 
+journal_dir = abspath(join(confdir, "journal"))
+
+recovery_dir = abspath(join(confdir, "recovery"))
+
+preview_cache_dir = abspath(join(confdir, "previews"))
+
+# maximal number of previews in the preview cache
+preview_cache_size = 2000
+
 temp_dir = abspath(join(confdir, "temp"))
 
 recordings_dir = abspath(join(temp_dir, recordings_folder))
@@ -87,10 +98,16 @@ travel_sensor_draw_images_dir = join(temp_dir, travel_sensor_draw_images)
 
 travel_sensor_sensors_dir = join(temp_dir, travel_sensor_sensors)
 
+field_cache_dir = abspath(join(temp_dir, "field_cache"))
+
 dirs = [confdir,
         cameras_dir,
         server_dir,
+        measuring_card_dir,
         log_dir,
+        journal_dir,
+        recovery_dir,
+        preview_cache_dir,
         temp_dir,
         experiment_dir,
         storage_temp_dir,
@@ -102,7 +119,8 @@ dirs = [confdir,
         displacement_u_dir, displacement_v_dir,
         travel_sensor_dir, travel_sensor_images_dir,
         travel_sensor_draw_images_dir, travel_sensor_sensors_dir,
-        strain_dir, strain_exx_dir, strain_exy_dir, strain_eyy_dir
+        strain_dir, strain_exx_dir, strain_exy_dir, strain_eyy_dir,
+        field_cache_dir
         ]
 
 #=========================================================================
@@ -125,6 +143,18 @@ force_file = "force.npy"
 
 recorder_file = "recorded_images.json"
 
+journal_values_file = "recordings.journal"
+
+journal_images_file = "images.journal"
+
+journal_saved_file = "saved.json"
+
+field_cache_file = "{0}_{1}.npy"
+
+field_mask_file = "{0}_mask_{1}.npy"
+
+field_manifest_file = "{0}.json"
+
 correlation_properties_file = "correlation_properties.json"
 
 roi_file = "roi.png"
@@ -135,6 +165,8 @@ phases_file = "phases.json"
 
 measuring_card_file = "measuring_card.json"
 
+backend_file = "backend.json"
+
 smrc_server = "smrc_server.json"
 
 udisplacement_file="U_disp_{0}.csv"
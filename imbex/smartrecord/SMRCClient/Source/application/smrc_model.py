@@ -20,7 +20,7 @@ from application.smrc_handler import SMRCHandler
 from basic_modules.basic_classes import InstanceUItem
 from basic_modules.basic_dialogs import ProcessDialog, WarningDialog
 from basic_modules.basic_methods import \
-    resize_image, create_strain_images, \
+    resize_images, create_strain_images, \
     get_all_files, clear_folder,\
     clear_temp_folder, resize_strain_images
 from camera.camera_selector import CameraSelector
@@ -158,6 +158,8 @@ class SMRCModel(HasTraits):
         :param project: Name of the project
         :type project: string
         """
+        # releases the mapped recordings before the files are removed
+        self.experiment.recorder.recorder.reset([])
         clear_temp_folder()
         try:
             if from_server:
@@ -179,17 +181,8 @@ class SMRCModel(HasTraits):
         self.logger.debug("Download project from server")
         self.server.download_project(project)
         files = get_all_files(images_dir)
-        n = len(files)
-        progress = ProcessDialog(title="Resize images", max_n=n)
-        for i in range(n):
-            f = files[i]
-            self.logger.debug("Resize image: {0}".format(f))
-            progress.update(i, "Resize image: {0}".format(f))
-            try:
-                resize_image(join(images_dir, f), True, True)
-            except Exception:
-                resize_image(join(images_dir, f))
-        progress.close()
+        self.logger.debug("Resize {0} images".format(len(files)))
+        resize_images([join(images_dir, f) for f in files], True, True)
         self.create_strain_files()
         
 
@@ -4,8 +4,9 @@
 """
 import warnings
 warnings.filterwarnings("ignore")
+from collections import OrderedDict
 from copy import deepcopy
-from threading import Thread
+from threading import Thread, Lock
 from numpy import array
 from traits.api import Str, Instance, HasTraits, Dict, Property
 from traitsui.api import \
@@ -21,6 +22,62 @@ class RunThread(Thread):
         self.start()
 
 
+class LRUCache(object):
+    """
+    Thread-safe cache with a maximal number of items. If the cache is
+    full, the least recently used item is removed.
+    """
+
+    def __init__(self, max_size):
+        """
+        :param max_size: Maximal number of items
+        :type max_size: int
+        """
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = Lock()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def get(self, key, default=None):
+        """Returns the item by the given key and marks it as used.
+
+        :param key: Key of the item
+        :type key: object
+        :param default: Value if the cache contains no such item
+        :type default: object
+        :rtype: object
+        """
+        with self.lock:
+            try:
+                value = self.items.pop(key)
+            except KeyError:
+                return default
+            self.items[key] = value
+            return value
+
+    def put(self, key, value):
+        """Adds the item and removes the least recently used items.
+
+        :param key: Key of the item
+        :type key: object
+        :param value: Item
+        :type value: object
+        """
+        with self.lock:
+            self.items.pop(key, None)
+            self.items[key] = value
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        """Removes all items."""
+        with self.lock:
+            self.items.clear()
+
+
 class InstanceUItem(UItem):
     """Convenience class for including an Instance in a View."""
 
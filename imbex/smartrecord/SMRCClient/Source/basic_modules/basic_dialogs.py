@@ -229,6 +229,31 @@ class ErrorDialogs(HasTraits):
     )
 
 
+class InfoDialogs(HasTraits):
+    """Dialog to show informations"""
+
+    info = Str()
+
+    def open_info(self, msg):
+        """Opens the dialog with the given message
+
+        :param msg: Message
+        :type msg: string
+        """
+        self.info = msg
+        self.configure_traits(view="info_view", kind="livemodal")
+
+    info_view = View(
+        UItem('info', style='readonly'),
+        buttons=['OK'],
+        resizable=True,
+        width=300,
+        height=75,
+        title='Information',
+        icon=ImageResource("../icons/smrc_icon.png")
+    )
+
+
 class WarningDialog(HasTraits):
     """Dialog to show warnings."""
     warning_icon = Image('../../icons/warning.png')
@@ -2,13 +2,21 @@
 .. module: basics_methods
 .. moduleauthor: Marcel Kennert
 """
+from ctypes import Structure, c_long, byref, CDLL
+from ctypes.util import find_library
 from datetime import datetime
+from hashlib import sha1
 from logging import DEBUG, basicConfig, Formatter, FileHandler, getLogger
-from os import listdir, remove, makedirs, unlink
-from os.path import join, basename, isfile, isdir
-from shutil import rmtree
+from multiprocessing import Pool, cpu_count
+from os import listdir, remove, makedirs, unlink, utime, rename, getpid
+from os.path import join, basename, isfile, isdir, getmtime, splitext
+from shutil import rmtree, copyfile
+import sys
+from threading import Lock
+from time import time
 
-from cv2 import imread, imwrite, resize, addWeighted
+from cv2 import imread, imwrite, resize, addWeighted, INTER_AREA, \
+    IMREAD_REDUCED_COLOR_2, IMREAD_REDUCED_COLOR_4, IMREAD_REDUCED_COLOR_8
 
 from application.configuration import \
     resized_images_dir, roi_file, images_dir, corr_properties_dir, \
@@ -18,12 +26,112 @@ from application.configuration import \
     displacement_v_dir, dirs, log_dir, result_dir, travel_sensor_dir,\
     travel_sensor_images_dir, travel_sensor_draw_images_dir,\
     travel_sensor_sensors_dir, strain_dir, strain_exx_dir, strain_exy_dir,\
-    strain_eyy_dir
+    strain_eyy_dir, preview_cache_dir, preview_cache_size, field_cache_dir
 from basic_modules.basic_dialogs import ProcessDialog
 import matplotlib.pyplot as plt
 import numpy as np
 
 
+#=========================================================================
+# Monotonic clock
+#=========================================================================
+
+if sys.platform == "win32":
+    # time.clock is a monotonic high resolution counter on windows
+    from time import clock as monotonic
+else:
+    class _Timespec(Structure):
+        _fields_ = [("tv_sec", c_long), ("tv_nsec", c_long)]
+
+    try:
+        _clock_gettime = CDLL(find_library("rt") or find_library("c"),
+                              use_errno=True).clock_gettime
+    except (OSError, AttributeError):
+        _clock_gettime = None
+
+    def monotonic():
+        """Returns the seconds of a clock which can not go backwards.
+
+        :rtype: float
+        """
+        if _clock_gettime is None:
+            return time()
+        ts = _Timespec()
+        # CLOCK_MONOTONIC = 1
+        if _clock_gettime(1, byref(ts)) != 0:
+            return time()
+        return ts.tv_sec + ts.tv_nsec * 1e-9
+
+
+# size of the previews (width, height)
+PREVIEW_SIZE = (300, 225)
+
+# reduced decoding modes of the JPEG-decoder by their scale factor
+REDUCED_MODES = ((8, IMREAD_REDUCED_COLOR_8), (4, IMREAD_REDUCED_COLOR_4),
+                 (2, IMREAD_REDUCED_COLOR_2))
+
+# ROI-overlays in the size of the previews by their path
+_roi_cache = {}
+
+_roi_lock = Lock()
+
+
+def read_reduced(fpath, size=PREVIEW_SIZE):
+    """
+    Reads the image with the greatest reduction which is not smaller than
+    the given size. JPEG-images are scaled while they are decoded, so
+    only a fraction of the full-resolution image is decoded.
+
+    :param fpath: Path to the image
+    :type fpath: string
+    :param size: Minimal size (width, height) of the image
+    :type size: Tuple(int, int)
+    :returns: Image or None if the image can not be read
+    :rtype: ndarray
+    """
+    factor, mode = REDUCED_MODES[0]
+    img = imread(fpath, mode)
+    if img is None:
+        return None
+    h, w = img.shape[:2]
+    if w >= size[0] and h >= size[1]:
+        return img
+    # the size of the full image is known by the smallest image
+    w, h = w * factor, h * factor
+    for factor, mode in REDUCED_MODES[1:]:
+        if w // factor >= size[0] and h // factor >= size[1]:
+            return imread(fpath, mode)
+    return imread(fpath)
+
+
+def get_preview_roi(fpath):
+    """
+    Returns the ROI-overlay in the size of the previews. The overlay is
+    read once and cached until the file changes.
+
+    :param fpath: Path to the ROI-image
+    :type fpath: string
+    :rtype: ndarray
+    """
+    mtime = getmtime(fpath)
+    with _roi_lock:
+        cached = _roi_cache.get(fpath)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    roi = imread(fpath)
+    if roi.shape[1::-1] != PREVIEW_SIZE:
+        roi = resize(roi, PREVIEW_SIZE, interpolation=INTER_AREA)
+    with _roi_lock:
+        _roi_cache[fpath] = (mtime, roi)
+    return roi
+
+
+def clear_roi_cache():
+    """Removes the cached ROI-overlays, e.g. after a new ROI is saved."""
+    with _roi_lock:
+        _roi_cache.clear()
+
+
 def resize_image(fpath, draw_roi=False, after_experiment=False):
     """Resizes the images and save them in the temp-folder
 
@@ -36,21 +144,136 @@ def resize_image(fpath, draw_roi=False, after_experiment=False):
     """
     fname = basename(fpath)
     if draw_roi and after_experiment:
-        img = imread(join(images_dir, fname))
-        roi = imread(join(corr_properties_dir, roi_file))
-        img = addWeighted(img, 0.6, roi, 0.4, 0)
-        resized_img = resize(img, (300, 225))
+        img = read_reduced(join(images_dir, fname))
+        img = resize(img, PREVIEW_SIZE, interpolation=INTER_AREA)
+        roi = get_preview_roi(join(corr_properties_dir, roi_file))
+        resized_img = addWeighted(img, 0.6, roi, 0.4, 0)
     elif draw_roi:
         img = imread(join(resized_images_dir, fname))
-        roi = imread(join(resized_images_dir, roi_file))
-        img = resize(img, (300, 225))
+        roi = get_preview_roi(join(resized_images_dir, roi_file))
+        img = resize(img, PREVIEW_SIZE)
         resized_img = addWeighted(img, 0.6, roi, 0.4, 0)
     else:
-        img = imread(join(images_dir, fname))
-        resized_img = resize(img, (300, 225))
+        img = read_reduced(join(images_dir, fname))
+        resized_img = resize(img, PREVIEW_SIZE, interpolation=INTER_AREA)
     imwrite(join(resized_images_dir, fname), resized_img)
 
 
+def resize_images(fpaths, draw_roi=False, after_experiment=False,
+                  title="Resize images"):
+    """
+    Resizes the given images in a process-pool and shows the progress.
+    Every preview is saved in the preview cache by the hash of the files
+    it was made of, so a preview which was already created (e.g. when a
+    project is opened again) is copied instead of resized. If the ROI can
+    not be drawn the image is resized without the ROI.
+
+    :param fpaths: Paths to the images
+    :type fpaths: List(string)
+    :param draw_roi: Overdraw the ROI about the images (optional)
+    :type draw_roi: Bool
+    :param after_experiment: Necessary if the project was loaded (optional)
+    :type after_experiment: Bool
+    :param title: Title of the progress-dialog
+    :type title: string
+    :returns: Number of images which were resized (not cached)
+    :rtype: int
+    """
+    n = len(fpaths)
+    if n == 0:
+        return 0
+    jobs = [(fpath, draw_roi, after_experiment) for fpath in fpaths]
+    processes = min(cpu_count(), n)
+    pool = Pool(processes) if processes > 1 else None
+    results = pool.imap_unordered(_resize_job, jobs) if pool is not None \
+        else (_resize_job(job) for job in jobs)
+    progress = ProcessDialog(title=title, max_n=n)
+    resized = 0
+    try:
+        for i, (fname, cached) in enumerate(results):
+            resized += not cached
+            progress.update(i + 1, "Resize image: {0}".format(fname))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        progress.close()
+    getLogger("Application").debug(
+        "Resized {0} images, {1} from the preview cache".format(
+            resized, n - resized))
+    prune_preview_cache()
+    return resized
+
+
+def prune_preview_cache(max_files=preview_cache_size):
+    """Removes the least recently used previews of the preview cache.
+
+    :param max_files: Maximal number of previews in the cache
+    :type max_files: int
+    """
+    files = get_all_files(preview_cache_dir)
+    if len(files) <= max_files:
+        return
+    files.sort(key=lambda f: getmtime(join(preview_cache_dir, f)))
+    for f in files[:len(files) - max_files]:
+        remove(join(preview_cache_dir, f))
+
+
+def _preview_key(fpath, draw_roi, after_experiment):
+    # Returns the hash of the files which resize_image reads to
+    # create the preview of the image
+    fname = basename(fpath)
+    if draw_roi and after_experiment:
+        inputs = [join(images_dir, fname), join(corr_properties_dir, roi_file)]
+    elif draw_roi:
+        inputs = [join(resized_images_dir, fname),
+                  join(resized_images_dir, roi_file)]
+    else:
+        inputs = [join(images_dir, fname)]
+    h = sha1("{0}{1}{2}".format(draw_roi, after_experiment, PREVIEW_SIZE))
+    for path in inputs:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), ""):
+                h.update(chunk)
+    return h.hexdigest() + splitext(fname)[1]
+
+
+def _cached_resize(fpath, draw_roi, after_experiment):
+    # Copies the preview from the preview cache or resizes the image
+    # and saves the preview in the cache. Returns True if the preview
+    # was cached.
+    cpath = join(preview_cache_dir,
+                 _preview_key(fpath, draw_roi, after_experiment))
+    dst = join(resized_images_dir, basename(fpath))
+    if isfile(cpath):
+        copyfile(cpath, dst)
+        # the modification time marks the last use of the preview
+        utime(cpath, None)
+        return True
+    resize_image(fpath, draw_roi, after_experiment)
+    # an other worker can save the same preview at the same time
+    part = "{0}.{1}".format(cpath, getpid())
+    copyfile(dst, part)
+    try:
+        rename(part, cpath)
+    except OSError:
+        remove(part)
+    return False
+
+
+def _resize_job(job):
+    # Resizes one image of resize_images in a worker and returns
+    # its name and whether the preview was cached
+    fpath, draw_roi, after_experiment = job
+    try:
+        cached = _cached_resize(fpath, draw_roi, after_experiment)
+    except Exception:
+        if not draw_roi:
+            raise
+        cached = _cached_resize(fpath, False, False)
+    return basename(fpath), cached
+
+
 def resize_strain_images():
     """Resizes all strain-images in the folder: /evaluation/results/normal"""
     files = get_all_files(result_normal_dir)
@@ -204,7 +427,8 @@ def clear_temp_folder():
         displacement_u_dir, displacement_v_dir,
         travel_sensor_dir, travel_sensor_images_dir,
         travel_sensor_draw_images_dir, travel_sensor_sensors_dir,
-        strain_dir, strain_exx_dir, strain_exy_dir, strain_eyy_dir
+        strain_dir, strain_exx_dir, strain_exy_dir, strain_eyy_dir,
+        field_cache_dir
         ]
     for d in temp_dirs:
         clear_folder(d)
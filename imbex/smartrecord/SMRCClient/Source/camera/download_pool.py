@@ -0,0 +1,149 @@
+"""
+.. module: download_pool
+.. moduleauthor: Marcel Kennert
+"""
+from collections import deque
+from logging import getLogger
+from threading import Condition
+from time import time
+
+from basic_modules.basic_classes import RunThread
+
+
+class DownloadPool(object):
+    """
+    Fixed number of worker threads which download the images of the
+    camera. The jobs are queued by their kind, previews are served before
+    full images and every kind has a maximal number of parallel jobs, so
+    the jobs of one kind finish in the order of the queue. If too many
+    jobs are pending, submit blocks the caller (back-pressure), except
+    for the callers which must not wait (e.g. the acquisition).
+    """
+
+    PREVIEW = "preview"
+
+    IMAGE = "image"
+
+    logger = getLogger("Application")
+
+    def __init__(self, limits=None, max_pending=32):
+        """
+        :param limits: Maximal number of parallel jobs of every kind
+        :type limits: Dictionary
+        :param max_pending: Maximal number of queued jobs of every kind
+        :type max_pending: int
+        """
+        if limits is None:
+            limits = {self.PREVIEW: 1, self.IMAGE: 1}
+        # kinds in the order of their priority
+        self.kinds = [k for k in (self.PREVIEW, self.IMAGE) if k in limits]
+        self.limits = limits
+        self.max_pending = max_pending
+        self.condition = Condition()
+        self.queues = dict((k, deque()) for k in self.kinds)
+        self.active = dict((k, 0) for k in self.kinds)
+        self.completed = dict((k, 0) for k in self.kinds)
+        self.failed = dict((k, 0) for k in self.kinds)
+        self.durations = dict((k, 0.) for k in self.kinds)
+        self.waits = dict((k, 0.) for k in self.kinds)
+        self.started = time()
+        for _ in range(sum(limits.values())):
+            RunThread(target=self._work)
+
+    def submit(self, kind, target, args=(), timeout=None, block=True):
+        """Queues a new job. Blocks while too many jobs of the kind are
+        pending.
+
+        :param kind: Kind of the job (PREVIEW or IMAGE)
+        :type kind: string
+        :param target: Function which executes the job
+        :type target: function
+        :param args: Arguments of the function
+        :type args: Tuple
+        :param timeout: Maximal time to wait for a free place,\
+            None to wait without limit
+        :type timeout: float
+        :param block: False to queue the job without waiting for a\
+            free place
+        :type block: bool
+        :raises: ValueError
+        """
+        deadline = None if timeout is None else time() + timeout
+        with self.condition:
+            # bounded by kind, so a worker which queues a job of another
+            # kind only waits for the workers of that kind
+            while block and len(self.queues[kind]) >= self.max_pending:
+                if deadline is None:
+                    self.condition.wait()
+                else:
+                    remaining = deadline - time()
+                    if remaining <= 0:
+                        raise ValueError("The download queue is full")
+                    self.condition.wait(remaining)
+            self.queues[kind].append((target, args, time()))
+            self.condition.notify_all()
+
+    def get_pending(self):
+        """Returns the number of queued jobs.
+
+        :rtype: int
+        """
+        return sum(len(q) for q in self.queues.values())
+
+    def get_metrics(self):
+        """
+        Returns the queue depth, the number of active, completed and failed
+        jobs, the throughput (jobs per second) and the mean waiting and
+        download time (in seconds) of every kind.
+
+        :rtype: Dictionary
+        """
+        with self.condition:
+            elapsed = max(time() - self.started, 1e-6)
+            metrics = {}
+            for k in self.kinds:
+                n = max(self.completed[k] + self.failed[k], 1)
+                metrics[k] = {"queued": len(self.queues[k]),
+                              "active": self.active[k],
+                              "completed": self.completed[k],
+                              "failed": self.failed[k],
+                              "throughput": self.completed[k] / elapsed,
+                              "mean_wait": self.waits[k] / n,
+                              "mean_duration": self.durations[k] / n}
+            return metrics
+
+    def _next_job(self):
+        # Returns the next job which can start or None. The lock
+        # must be acquired by the caller.
+        for k in self.kinds:
+            if self.queues[k] and self.active[k] < self.limits[k]:
+                return k, self.queues[k].popleft()
+        return None
+
+    def _work(self):
+        # Executes the jobs of the queues
+        while True:
+            with self.condition:
+                job = self._next_job()
+                while job is None:
+                    self.condition.wait()
+                    job = self._next_job()
+                kind, (target, args, queued) = job
+                self.active[kind] += 1
+                self.condition.notify_all()
+            start = time()
+            success = True
+            try:
+                target(*args)
+            except Exception, e:
+                success = False
+                self.logger.error("Download failed: {0}".format(e))
+            with self.condition:
+                self.active[kind] -= 1
+                if success:
+                    self.completed[kind] += 1
+                else:
+                    self.failed[kind] += 1
+                self.waits[kind] += start - queued
+                self.durations[kind] += time() - start
+                self.condition.notify_all()
@@ -2,16 +2,15 @@
 .. module: http_camera
 .. moduleauthor: Marcel Kennert
 """
+from collections import deque
 from json import dump, load
 from logging import getLogger
 from os.path import join, basename
-from re import split
-from threading import Lock
-from time import sleep
-from urllib import urlretrieve
+from re import match
+from time import sleep, time
 
-from requests import get, ConnectionError
-from traits.api import Button, Bool, Str, Instance, List
+from requests import ConnectionError, RequestException
+from traits.api import Button, Bool, Str, Instance, List, Float
 from traitsui.api import View, UItem, Group, VGroup, HGroup, Item
 
 from application.configuration import cameras_dir
@@ -20,6 +19,35 @@ from basic_modules.basic_classes import RunThread, Combobox
 from basic_modules.basic_methods import \
     convert_number, resize_image, get_all_files
 from camera.camera_interfaces import ICameraProperties, ICameraHandler
+from camera.download_pool import DownloadPool
+from camera.http_client import CameraClient
+
+
+
+def increment_number(name, last=True):
+    """
+    Increments the last (or the first) number of the name and keeps the
+    number of its digits (e.g. IMGP0099.JPG -> IMGP0100.JPG). If the
+    number does not fit into its digits anymore, it restarts with 1.
+
+    :param name: Name of a file or a folder
+    :type name: string
+    :param last: True to increment the last number, False for the first
+    :type last: bool
+    :returns: Incremented name and True if the number overflowed
+    :rtype: Tuple(string, bool)
+    :raises: ValueError
+    """
+    pattern = r"(.*?)(\d+)(\D*)$" if last else r"(\D*)(\d+)(.*)$"
+    m = match(pattern, name)
+    if m is None:
+        raise ValueError("The name {0} contains no number".format(name))
+    prefix, number, suffix = m.groups()
+    n = int(number) + 1
+    overflow = len(str(n)) > len(number)
+    if overflow:
+        n = 1
+    return prefix + str(n).zfill(len(number)) + suffix, overflow
 
 #=========================================================================
 # Properties to transfer the images via WLAN
@@ -99,9 +127,26 @@ class HTTPCameraProperties(ICameraProperties):
 
     def generate_next_file(self, f):
         "With the knowledge of the last file-name can the next file generated."
-        args = filter(None, split(r'(\d+)', f))
-        fn = int(args[1]) + 1
-        return "{0}{1}{2}".format(args[0], fn, args[2])
+        return increment_number(f)[0]
+
+    def generate_next(self, folder, f):
+        """
+        Returns the folder and the name of the file after the given file.
+        If the number of the file overflows, the camera continues in the
+        next folder (e.g. 100_0101/IMGP9999.JPG -> 101_0101/IMGP0001.JPG).
+
+        :param folder: Name of the folder
+        :type folder: string
+        :param f: Name of the file
+        :type f: string
+        :returns: Folder and file
+        :rtype: Tuple(string, string)
+        :raises: ValueError
+        """
+        f, overflow = increment_number(f)
+        if overflow:
+            folder = increment_number(folder, last=False)[0]
+        return folder, f
 
     def selected_changed(self, selected_key):
         """Update the properties when the user select a new camera."""
@@ -132,111 +177,189 @@ class HTTPCameraHandler(ICameraHandler):
 
     camera_model = Instance(HTTPCameraProperties, ())
 
-    lock = Lock()
-
     listeners = List()
-    
+
+    # maximal time (in seconds) to wait for the image of a shot
+    ready_timeout = Float(10.)
+
+    # first and maximal time (in seconds) between two readiness checks
+    poll_interval = Float(0.05)
+
+    max_poll_interval = Float(0.8)
+
     logger = getLogger("Application")
     
     def __init__(self):
         self.img_num = 0
-        self.download_image = Bool(False)
-        self.queue = []
-        self.queue_preview = []
+        self.client = None
+        # time (in seconds) between the shot and the availability
+        self.availability = deque(maxlen=1000)
+        self.pool = DownloadPool()
         self.transfer_type = "HTTP"
 
     def download_last_image(self):
-        """Downloads the last image in the full-resolution and as a preview"""
-        # wait 2 seconds before transfer the image to make sure that
-        # that the camera safes the last image
-        sleep(2)
-        folder, f = self.get_last_folder_file()
-        url_photo = self.camera_model.url_photo.format(self.url, folder, f)
+        """
+        Downloads the last image in the full-resolution and as a preview.
+        The downloads run in the download pool. The method is called by
+        the phase thread, so it never waits for the pool; the back-pressure
+        applies to the downloads which are queued by the job.
+        """
         self.img_num = self.img_num + 1
         fname = image_file.format(convert_number(self.img_num),
                                   self.camera_model.image_ext)
-        self.append_preview_to_queue(url_photo, fname)
+        self.pool.submit(DownloadPool.PREVIEW, self._download_last_image,
+                         (fname, time()), block=False)
+
+    def _download_last_image(self, fname, requested):
+        # waits until the camera has saved the image of the shot
+        folder, f = self.wait_for_next_file(requested)
+        url_photo = self.camera_model.url_photo.format(self.url, folder, f)
+        self._download_preview(url_photo, fname)
         self.append_image_to_queue(join(images_dir, fname), fname, url_photo)
 
     def download_reference_image(self):
         """Downloads the last taken image and save it as the reference image"""
+        requested = time()
         f = image_file.format(convert_number(0), self.camera_model.image_ext)
         fpath = join(images_dir, f)
-        folder, f = self.get_last_folder_file()
+        folder, f = self.wait_for_next_file(requested)
         url_photo = self.camera_model.url_photo.format(self.url, folder, f)
         self.append_image_to_queue(fpath, f, url_photo, threading=False)
         resize_image(fpath)
 
     def append_image_to_queue(self, fpath, fname, url_photo, threading=True):
-        # Appends a image to the event queue
+        # Appends a image to the queue of the download pool
         try:
-            with self.lock:
-                self.queue.append((url_photo, fpath))
-            if threading and not self.download_image:
-                # Do not start a new thread if one is already running
-                RunThread(target=self._download_images_in_background)
-            elif not threading:
+            if threading:
+                self.pool.submit(DownloadPool.IMAGE, self._download_image,
+                                 (url_photo, fpath))
+            else:
                 # Do not download the images in the background
-                self._download_images_in_background()
+                self._download_image(url_photo, fpath)
         except Exception, e:
             msg = "Image: {0} Exception: {1}".format(self.img_num, str(e))
             self.logger.error(msg)
 
-    def _download_images_in_background(self):
-        # download the images
+    def _download_image(self, url_photo, fpath):
+        # download a image in the full resolution
         self.state = "Download image"
-        self.download_image = True
-        while len(self.queue) > 0:
-            try:
-                with self.lock:
-                    url_photo, fpath = self.queue.pop(0)
-                urlretrieve(url_photo, fpath)
-                if self.img_num > 0:
-                    for listener in self.listeners:
-                        listener.update_downloaded_image(basename(fpath))
-                self.logger.debug("Downloaded image: {0}".format(fpath))
-            except Exception, e:
-                self.logger.error(str(e))
-        self.state = "Download finished"
-        self.download_image = False
+        self.get_client().download(url_photo, fpath)
+        if self.img_num > 0:
+            for listener in self.listeners:
+                listener.update_downloaded_image(basename(fpath))
+        self.logger.debug("Downloaded image: {0}".format(fpath))
+        if self.pool.get_pending() == 0:
+            self.state = "Download finished"
 
     def append_preview_to_queue(self, url, fname):
-        # Appends a preview to the event queue
+        # Appends a preview to the queue of the download pool
         try:
-            with self.lock:
-                self.queue_preview.append((url, fname))
-            RunThread(target=self._download_previews_in_background)
+            self.pool.submit(DownloadPool.PREVIEW, self._download_preview,
+                             (url, fname))
         except Exception, e:
             msg = "Image: {0} Exception: {1}".format(self.img_num, str(e))
             self.logger.error(msg)
 
-    def _download_previews_in_background(self):
-        # download previews
-        while len(self.queue_preview) > 0:
+    def _download_preview(self, url, fname):
+        # download a preview
+        fpath = join(resized_images_dir, fname)
+        self.get_client().download(url + "?size=view", fpath)
+        resize_image(fpath, self.img_num > 0)
+        if self.img_num > 0:
+            for listener in self.listeners:
+                listener.update_downloaded_preview(fname)
+
+    def get_download_metrics(self):
+        """Returns the metrics of the download pool.
+
+        :returns: Queue depth and throughput of the previews and images,\
+            the availability of the images and the number of loaded\
+            whole listings
+        :rtype: Dictionary
+        """
+        metrics = self.pool.get_metrics()
+        if self.client is not None:
+            metrics["full_listings"] = self.client.full_listings
+        if len(self.availability) > 0:
+            metrics["availability"] = {
+                "last": self.availability[-1],
+                "mean": sum(self.availability) / len(self.availability),
+                "max": max(self.availability)}
+        return metrics
+
+    def get_client(self):
+        """Returns the HTTP-client for the current ip-address.
+
+        :rtype: CameraClient
+        """
+        self.url = self.camera_model.url.format(self.camera_model.ip_address)
+        if self.client is None or self.client.url != self.url:
+            self.client = CameraClient(self.url,
+                                       self.camera_model.generate_next)
+        return self.client
+
+    def wait_for_next_file(self, requested):
+        """
+        Polls the camera until the file after the last known file is
+        available. The time between the checks grows exponential from
+        poll_interval to max_poll_interval. If the file is not available
+        after ready_timeout seconds, the whole listing is loaded to find
+        a new folder.
+
+        :param requested: Time of the shot (seconds since the epoch)
+        :type requested: float
+        :returns: Folder and file of the shot
+        :rtype: List(string)
+        """
+        client = self.get_client()
+        try:
+            if client.file is None:
+                client.refresh_listing()
+        except (RequestException, ValueError, KeyError, IndexError), e:
+            self.logger.error(str(e))
+            return self.get_last_folder_file()
+        folder, last = client.folder, client.file
+        folder, expected = self.camera_model.generate_next(folder, last)
+        deadline = requested + self.ready_timeout
+        delay = self.poll_interval
+        while True:
             try:
-                with self.lock:
-                    url, fname = self.queue_preview.pop(0)
-                fpath = join(resized_images_dir, fname)
-                urlretrieve(url + "?size=view", fpath)
-                resize_image(fpath, self.img_num > 0)
-                if self.img_num > 0:
-                    for listener in self.listeners:
-                        listener.update_downloaded_preview(fname)
-            except Exception, e:
-                self.logger.error(str(e))
+                if client.exists(folder, expected):
+                    client.set_last_file(folder, expected)
+                    break
+            except RequestException, e:
+                self.logger.debug(str(e))
+            if time() >= deadline:
+                folder, expected = self.get_last_folder_file()
+                if expected == last:
+                    self.logger.warning(
+                        "No new image after {0}s".format(self.ready_timeout))
+                break
+            sleep(max(min(delay, deadline - time()), 0.))
+            delay = min(2 * delay, self.max_poll_interval)
+        available = time() - requested
+        self.availability.append(available)
+        self.logger.debug("Image {0} available after {1:.3f}s".format(
+            expected, available))
+        self.folder, self.f = folder, expected
+        return [folder, expected]
 
     def get_last_folder_file(self):
         try:
-            self.url = self.camera_model.url.format(
-                self.camera_model.ip_address)
-            r = get(self.url).json()
-            self.folder = r['dirs'][-1]
-            self.f = self.folder['files'][-1]
-            res = [self.folder['name'], self.f]
+            client = self.get_client()
+            last = client.file
+            folder, f = client.update_listing()
+            if f == last:
+                # no new file in the folder, the camera may use a new folder
+                self.logger.warning("The image after {0} was not found, "
+                                    "load the whole listing".format(last))
+                folder, f = client.refresh_listing()
+            self.folder, self.f = folder, f
+            res = [self.folder, self.f]
         except Exception:
-            self.f = self.camera_model.generate_next_file(self.f)
-            res = [self.folder['name'], self.f]
-            sleep(5)
+            self.folder, self.f = self.camera_model.generate_next(self.folder,
+                                                                  self.f)
+            res = [self.folder, self.f]
         return res
 
     #=========================================================================
@@ -262,9 +385,7 @@ class HTTPCameraHandler(ICameraHandler):
         self.state = "Try to connect with the camera"
         self.try_to_connect = True
         try:
-            self.url = self.camera_model.url.format(
-                self.camera_model.ip_address)
-            get(self.url).json()
+            self.get_client().refresh_listing()
             self.state = 'Connected'
             self.connected = True
             self.error = False
@@ -281,6 +402,7 @@ class HTTPCameraHandler(ICameraHandler):
             ),
             UItem(
                 'camera_model', enabled_when='not connected', style='custom'),
+            Item('ready_timeout', label='Timeout [s]:'),
             UItem('connect_btn', enabled_when='not connected'),
             Group(
                 UItem("error_msg", style="readonly"),
@@ -0,0 +1,163 @@
+"""
+.. module: http_client
+.. moduleauthor: Marcel Kennert
+"""
+from logging import getLogger
+from os import remove, rename
+from os.path import isfile
+from threading import Lock, local
+
+from requests import Session
+
+
+class CameraClient(object):
+    """
+    HTTP-client for the camera. Every thread uses its own keep-alive
+    session, so the connections to the camera are reused. The images
+    are streamed in chunks to the disk. The directory listing of the
+    camera is loaded once and updated incrementally by checking the
+    next file names, so the costs per shot do not grow with the number
+    of photos on the card.
+    """
+
+    logger = getLogger("Application")
+
+    def __init__(self, url, generate_next, timeout=10.,
+                 chunk_size=65536):
+        """
+        :param url: Url of the photo-listing (e.g. http://ip/v1/photos)
+        :type url: string
+        :param generate_next: Function which returns the folder and the\
+            name of the file after the given folder and file
+        :type generate_next: function
+        :param timeout: Timeout (in seconds) of the requests
+        :type timeout: float
+        :param chunk_size: Size (in bytes) of the streamed chunks
+        :type chunk_size: int
+        """
+        self.url = url
+        self.generate_next = generate_next
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.local = local()
+        self.lock = Lock()
+        # cached listing: name of the last folder and its last file
+        self.folder = None
+        self.file = None
+        # number of loaded whole listings
+        self.full_listings = 0
+
+    def get_session(self):
+        """Returns the keep-alive session of the current thread.
+
+        :rtype: Session
+        """
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = Session()
+        return session
+
+    def get_json(self, url):
+        """Requests the given url and returns the parsed json.
+
+        :param url: Url of the request
+        :type url: string
+        :rtype: Dictionary
+        """
+        r = self.get_session().get(url, timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def get_photo_url(self, folder, f):
+        """Returns the url of the photo.
+
+        :param folder: Name of the folder
+        :type folder: string
+        :param f: Name of the file
+        :type f: string
+        :rtype: string
+        """
+        return "{0}/{1}/{2}".format(self.url, folder, f)
+
+    def exists(self, folder, f):
+        """Checks with the info-request whether the camera has the photo.
+
+        :param folder: Name of the folder
+        :type folder: string
+        :param f: Name of the file
+        :type f: string
+        :rtype: bool
+        """
+        r = self.get_session().get(self.get_photo_url(folder, f) + "/info",
+                                   timeout=self.timeout)
+        return r.status_code == 200
+
+    def refresh_listing(self):
+        """Loads the whole listing of the camera.
+
+        :returns: Last folder and last file
+        :rtype: Tuple(string, string)
+        """
+        r = self.get_json(self.url)
+        folder = r['dirs'][-1]
+        self.logger.debug("Loaded the whole listing [CameraClient]")
+        with self.lock:
+            self.full_listings += 1
+            self.folder = folder['name']
+            self.file = folder['files'][-1]
+            return self.folder, self.file
+
+    def update_listing(self):
+        """
+        Updates the cached listing with the files which were taken since
+        the last update. The whole listing is only loaded the first time.
+
+        :returns: Last folder and last file
+        :rtype: Tuple(string, string)
+        """
+        with self.lock:
+            folder, f = self.folder, self.file
+        if folder is None:
+            return self.refresh_listing()
+        candidate = self.generate_next(folder, f)
+        while self.exists(*candidate):
+            folder, f = candidate
+            candidate = self.generate_next(folder, f)
+        with self.lock:
+            self.folder = folder
+            self.file = f
+        return folder, f
+
+    def set_last_file(self, folder, f):
+        """Sets the last file of the cached listing.
+
+        :param folder: Name of the folder
+        :type folder: string
+        :param f: Name of the file
+        :type f: string
+        """
+        with self.lock:
+            self.folder = folder
+            self.file = f
+
+    def download(self, url, fpath):
+        """Streams the body of the url in chunks into the file.
+
+        :param url: Url of the image
+        :type url: string
+        :param fpath: Path of the file
+        :type fpath: string
+        """
+        part = fpath + ".part"
+        r = self.get_session().get(url, stream=True, timeout=self.timeout)
+        try:
+            r.raise_for_status()
+            with open(part, "wb") as f:
+                for chunk in r.iter_content(self.chunk_size):
+                    f.write(chunk)
+        finally:
+            r.close()
+        # the file is complete when it gets the final name
+        if isfile(fpath):
+            remove(fpath)
+        rename(part, fpath)
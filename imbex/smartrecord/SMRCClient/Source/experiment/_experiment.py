@@ -12,7 +12,7 @@ from application.configuration import images_dir
 from experiment.correlation.correlation_properties import CorrelationProperties
 from experiment.recorder.experiment_recorder import ExperimentRecorder
 from experiment.type.experiment_type import ExperimentType
-from basic_modules.basic_methods import get_all_files
+from basic_modules.basic_methods import get_all_files, monotonic
 from basic_modules.basic_dialogs import ErrorDialogs, ProcessDialog
 
 
@@ -53,6 +53,7 @@ class Experiment(HasTraits):
         self.logger.debug("Initialize Experiment")
         self.record_mode = record_mode
         self.smrc_model = parent
+        self.start_time = None
         camera = self.smrc_model.camera
         camera.add_listener(self)
         self.correlation_properties = CorrelationProperties(self)
@@ -175,6 +176,8 @@ class Experiment(HasTraits):
         # start.
         if self._check_attributes():
             self.reset_properties()
+            # same clock as the sampling times of the measuring card
+            self.start_time = monotonic()
             self.recorder.start()
             self.window.start_clock()
 
@@ -248,8 +251,14 @@ class Experiment(HasTraits):
         # Update the phase of the SMRC-Window
         self.smrc_model.smrc_window.current_phase = name
 
-    def get_time(self):
-        return self.smrc_model.smrc_window.clock
+    def get_start_time(self):
+        """Returns the start time of the recording.
+
+        :returns: Seconds of the monotonic clock, None if the recording\
+            was not started
+        :rtype: float
+        """
+        return self.start_time
 
     #=========================================================================
     # Traitsview
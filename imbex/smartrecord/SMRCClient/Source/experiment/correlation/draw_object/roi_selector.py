@@ -6,7 +6,7 @@ from copy import deepcopy
 from os.path import join, basename
 
 from cv2 import rectangle, imshow, imread, imwrite
-from cv2 import resize
+from cv2 import resize, INTER_AREA
 from numpy import zeros
 from pyface.image_resource import ImageResource
 from traits.api import HasTraits, Button
@@ -14,7 +14,8 @@ from traitsui.api import View, UItem, Image, VGroup, HGroup
 
 from application.configuration import \
     images_dir, roi_file, corr_properties_dir, resized_images_dir
-from basic_modules.basic_methods import resize_image, get_all_files
+from basic_modules.basic_methods import \
+    resize_images, get_all_files, clear_roi_cache, PREVIEW_SIZE
 from experiment.correlation.draw_object.draw_methods import IDraw
 
 
@@ -87,8 +88,7 @@ class ROIDialog(HasTraits):
     def _reset_btn_fired(self):
         del self.points[:]
         files = get_all_files(images_dir)
-        for f in files:
-            resize_image(f)
+        resize_images([join(images_dir, f) for f in files])
         self.ref_image = ImageResource(self.fname)
 
     def _add_btn_fired(self):
@@ -99,11 +99,11 @@ class ROIDialog(HasTraits):
             img_name = join(images_dir, basename(self.fname))
             roi = self.roi_selector.create_roi(imread(img_name), self.points)
             imwrite(fpath, roi)
-            imwrite(
-                join(resized_images_dir, roi_file), resize(roi, (300, 225)))
+            imwrite(join(resized_images_dir, roi_file),
+                    resize(roi, PREVIEW_SIZE, interpolation=INTER_AREA))
+            clear_roi_cache()
             files = get_all_files(images_dir)
-            for f in files:
-                resize_image(join(images_dir, f), True)
+            resize_images([join(images_dir, f) for f in files], True)
             self.ref_image = ImageResource(self.fname)
 
     view = View(
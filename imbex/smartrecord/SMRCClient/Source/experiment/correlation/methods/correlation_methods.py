@@ -2,9 +2,10 @@
 .. module: correlation_methods
 .. moduleauthor: Marcel Kennert
 """
+from collections import OrderedDict
+from logging import getLogger
 from os.path import join
 
-from numpy import loadtxt, nonzero
 from traits.api import HasTraits, Bool, Int, Instance, Button, List
 from traitsui.api import View, UItem, Item
 
@@ -15,8 +16,13 @@ from application.configuration import \
 from basic_modules.basic_classes import Combobox
 from basic_modules.basic_dialogs import ProcessDialog, ErrorDialogs
 from basic_modules.basic_methods import get_all_files, clear_folder
+from experiment.correlation.methods.field_cache import get_field_cache
+from experiment.correlation.methods.parallel_evaluation import \
+    evaluate_series
 from experiment.correlation.methods.sensor import \
-    SensorDialog, Sensor
+    SensorDialog, Sensor, SensorStencils
+from experiment.correlation.methods.sensor_layout import \
+    layout_lines, layout_grid
 
 
 class ICorrelate(HasTraits):
@@ -40,9 +46,20 @@ class SensorMethod(ICorrelate):
 
     horizontal = Bool()
 
+    # grid of sensors in both directions with number_of_sensors nodes
+    # in every direction
+    grid = Bool()
+
+    # number of processes of the evaluation, 0 to use all cores
+    processes = Int(0)
+
+    logger = getLogger("Application")
+
     options = Instance(Combobox, ())
 
     def __init__(self):
+        # values of the sensors like (sensor key, field identity): values
+        self.results = {}
         self.options.add_item('automatically', None)
         self.options.add_item('manually', None)
         self.options.selected_key = 'manually'
@@ -59,93 +76,87 @@ class SensorMethod(ICorrelate):
         if not self.manually:
             self.sensors = self.create_sensors()
             self.sensor_dialog.update_storage_properties()
-            self.sensor_dialog.update_images(self.sensors)
+            # the sensors are drawn when the dialog shows the images
+            self.sensor_dialog.set_sensors(self.sensors)
         self.correlate(self.sensors)
 
     def correlate(self, travel_sensors):
-        """Correlates the travel-sensors.
+        """
+        Correlates the travel-sensors. The values of every sensor are
+        cached by its points, its radius and the identity of the field
+        files, so only new and changed sensors are evaluated again.
 
         :param travel_sensors: All travel-sensors.
         :type travel_sensors: List(Sensor) 
         """
+        # the field-caches show their own dialog while they are updated
+        progress = None
         try:
-            udisplacements = get_all_files(displacement_u_dir)
-            vdisplacements = get_all_files(displacement_v_dir)
-            strain_exx = get_all_files(strain_exx_dir)
-            strain_exy = get_all_files(strain_exy_dir)
-            strain_eyy = get_all_files(strain_eyy_dir)
-            n = len(strain_exx)
+            caches = [get_field_cache(d) for d in
+                      (displacement_u_dir, displacement_v_dir,
+                       strain_exx_dir, strain_exy_dir, strain_eyy_dir)]
+            n = len(caches[2])
+            identity = tuple(c.get_identity() for c in caches) + (n,)
+            keys = [(t.get_key(), identity) for t in travel_sensors]
+            # one sensor of every key which is not cached
+            changed = OrderedDict()
+            for t, key in zip(travel_sensors, keys):
+                if key not in self.results:
+                    changed.setdefault(key, t)
+            self.logger.debug("Evaluate {0} of {1} sensors".format(
+                len(changed), len(travel_sensors)))
             progress = ProcessDialog(title="Calculate values", max_n=n)
-            for i in range(n):
-                progress.update(n=i, msg="Image: {0}".format(i))
-                udisp = loadtxt(join(displacement_u_dir, udisplacements[i]),
-                                delimiter=',')
-                vdisp = loadtxt(join(displacement_v_dir, vdisplacements[i]),
-                                delimiter=',')
-                sexx = loadtxt(join(strain_exx_dir, strain_exx[i]), delimiter=',')
-                sexy = loadtxt(join(strain_exy_dir, strain_exy[i]), delimiter=',')
-                seyy = loadtxt(join(strain_eyy_dir, strain_eyy[i]), delimiter=',')
-                for j in range(len(travel_sensors)):
-                    t = travel_sensors[j]
-                    tvals = []
-                    tvals.append(t.get_average_values(udisp))
-                    tvals.append(t.get_average_values(vdisp))
-                    tvals.append(t.get_average_values(sexx))
-                    tvals.append(t.get_average_values(sexy))
-                    tvals.append(t.get_average_values(seyy))
-                    t.append_values(tvals)
+            if changed:
+                # the stencils are compiled once for the series
+                stencils = SensorStencils(changed.values(),
+                                          caches[0].get_shape())
+                values = evaluate_series(
+                    [c.get_path() for c in caches], n, stencils,
+                    processes=self.processes or None,
+                    callback=lambda done: progress.update(
+                        n=done, msg="Image: {0}".format(done)))
+                for j, key in enumerate(changed):
+                    self.results[key] = values[:, :, j]
+            # only the values of the current sensors are kept
+            self.results = dict((key, self.results[key]) for key in keys)
+            for t, key in zip(travel_sensors, keys):
+                t.values = self.results[key].tolist()
             clear_folder(travel_sensor_sensors_dir)
             for t in travel_sensors:
                 t.save()
         except Exception:
             dialog=ErrorDialogs()
             dialog.open_error("Some files are missing. Cancel the process")
-        progress.close()
+        if progress is not None:
+            progress.close()
         
 
     def create_sensors(self):
-        """Generates sensors."""
-        udisp = get_all_files(displacement_u_dir)[0]
-        udisp = loadtxt(join(displacement_u_dir, udisp), delimiter=',')
-        rows, cols = nonzero(udisp)
+        """
+        Generates a regular layout of sensors on the mask of the first
+        u-displacements (parallel horizontal or vertical sensors or a
+        2-D grid of sensors).
+
+        :returns: Generated sensors
+        :rtype: List(Sensor)
+        """
+        mask = get_field_cache(displacement_u_dir).get_mask(0)
         n = self.number_of_sensors
-        res = []
-        if self.horizontal:
-            distances = self.divide_interval(rows[5], rows[-5], n)
-            for i in range(len(distances)):
-                dist = distances[i]
-                points = [(cols[1], dist), (cols[-1], dist)]
-                sensor=Sensor(travel_sensor_name.format(i), points)
-                sensor.radius=1
-                res.append(sensor)
+        if self.grid:
+            radius = 1
+            x1, y1, x2, y2 = layout_grid(mask, n, radius)
         else:
-            distances = self.divide_interval(cols[1], cols[-1], n)
-            for i in range(len(distances)):
-                dist = distances[i]
-                points = [(dist, rows[1]), (dist, rows[-1])]
-                sensor=Sensor(travel_sensor_name.format(i), points)
-                sensor.radius=5
-                res.append(sensor)
+            radius = 1 if self.horizontal else 5
+            x1, y1, x2, y2 = layout_lines(mask, n, self.horizontal, radius)
+        res = []
+        for i, (a, b, c, d) in enumerate(zip(x1.tolist(), y1.tolist(),
+                                             x2.tolist(), y2.tolist())):
+            sensor = Sensor(travel_sensor_name.format(i), [(a, b), (c, d)])
+            sensor.radius = radius
+            res.append(sensor)
+        self.logger.debug("Generated {0} sensors".format(len(res)))
         return res
 
-    def divide_interval(self, p1, p2, pnt_nr):
-        """Divides the given interval.
-
-        :param p1: Start-value of the interval.
-        :type p1: int
-        :param p2: End-value of the interval.
-        :type p2: int
-        :returns: The points of the interval.
-        :rtype: List(int)
-        """
-        d = abs(p2 - p1)
-        space = int(d / float(pnt_nr-1))
-        arr = [p1]
-        for i in range(1, pnt_nr - 1):
-            arr.append(p1 + i * space)
-        arr.append(p2)
-        return arr
-
     #=========================================================================
     # Traitsview + Traitsevents
     #=========================================================================
@@ -170,7 +181,8 @@ class SensorMethod(ICorrelate):
     view = View(
         Item('options', style='custom'),
         Item('number_of_sensors', visible_when='not manually'),
-        Item('horizontal', visible_when='not manually'),
+        Item('horizontal', visible_when='not manually and not grid'),
+        Item('grid', label='2-D grid', visible_when='not manually'),
         UItem('button_travel_sensor', visible_when='manually')
     )
 
@@ -0,0 +1,232 @@
+"""
+.. module: field_cache
+.. moduleauthor: Marcel Kennert
+"""
+from json import dump, load as jload
+from logging import getLogger
+from os import remove
+from os.path import join, basename, isfile, getmtime, getsize
+
+from numpy import load, loadtxt, float32
+from numpy.lib.format import open_memmap
+
+from application.configuration import \
+    field_cache_dir, field_cache_file, field_mask_file, field_manifest_file
+from basic_modules.basic_dialogs import ProcessDialog
+from basic_modules.basic_methods import get_all_files
+
+
+class FieldCache(object):
+    """
+    Binary cache of a series of fields (the csv-exports of the
+    correlation). All fields of the series are stacked in one float32
+    npy-file and the mask of the values which are not zero in a second
+    npy-file. Both stacks are memory-mapped for reading. The csv-files
+    are identified by their size and modification time, only new or
+    changed files are parsed again.
+    """
+
+    logger = getLogger("Application")
+
+    def __init__(self, directory, cache_dir=field_cache_dir):
+        """
+        :param directory: Directory of the csv-files
+        :type directory: string
+        :param cache_dir: Directory of the cache files
+        :type cache_dir: string
+        """
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.name = basename(directory)
+        # stacked csv-files like [name, size, mtime]
+        self.files = []
+        self.version = 0
+        self.fields = None
+        self.mask = None
+        self._load_manifest()
+
+    def __len__(self):
+        return len(self.files)
+
+    def update(self):
+        """Parses the new and changed csv-files and rebuilds the stacks.
+
+        :returns: True if the cache was changed
+        :rtype: Bool
+        :raises: ValueError
+        """
+        files = []
+        for f in get_all_files(self.directory):
+            fpath = join(self.directory, f)
+            files.append([f, getsize(fpath), getmtime(fpath)])
+        if files == self.files and self._exists(self.version):
+            return False
+        # rows of the stacks which can be reused
+        rows = {}
+        if self._exists(self.version):
+            rows = dict((tuple(f), i) for i, f in enumerate(self.files))
+        changed = [f for f in files if tuple(f) not in rows]
+        self.logger.debug("Convert {0} files of {1} [FieldCache]".format(
+            len(changed), self.name))
+        version = self.version + 1
+        progress = ProcessDialog(title="Convert fields", max_n=len(changed)) \
+            if changed else None
+        fields = mask = None
+        try:
+            k = 0
+            for i, f in enumerate(files):
+                row = rows.get(tuple(f))
+                if row is None:
+                    k += 1
+                    progress.update(k, "Convert file: {0}".format(f[0]))
+                    value = loadtxt(join(self.directory, f[0]), delimiter=',')
+                    nonzero = value != 0
+                else:
+                    value, nonzero = self.fields[row], self.mask[row]
+                if fields is None:
+                    shape = (len(files),) + value.shape
+                    fields = open_memmap(self._get_path(field_cache_file,
+                                                        version),
+                                         "w+", float32, shape)
+                    mask = open_memmap(self._get_path(field_mask_file,
+                                                      version),
+                                       "w+", bool, shape)
+                if value.shape != fields.shape[1:]:
+                    raise ValueError("The field {0} has a different shape"
+                                     .format(f[0]))
+                fields[i] = value
+                mask[i] = nonzero
+        finally:
+            if progress is not None:
+                progress.close()
+            if fields is not None:
+                fields.flush()
+                mask.flush()
+            del fields, mask
+        old = self.version
+        self.files = files
+        self.version = version
+        self._save_manifest()
+        self._open()
+        self._remove(old)
+        return True
+
+    def get_fields(self):
+        """Returns the stack of all fields like (images, rows, columns).
+
+        :rtype: ndarray
+        """
+        return self.fields
+
+    def get_field(self, index):
+        """Returns the field of the image by the given index.
+
+        :param index: Index of the image
+        :type index: int
+        :rtype: ndarray
+        """
+        return self.fields[index]
+
+    def get_mask(self, index):
+        """Returns the mask of the values which are not zero.
+
+        :param index: Index of the image
+        :type index: int
+        :rtype: ndarray
+        """
+        return self.mask[index]
+
+    def get_path(self):
+        """Returns the path of the npy-stack of the fields.
+
+        :rtype: string
+        """
+        return self._get_path(field_cache_file, self.version)
+
+    def get_identity(self):
+        """
+        Returns the identity of the stacked csv-files (name, size and
+        modification time), which changes with every changed file.
+
+        :rtype: Tuple
+        """
+        return tuple(tuple(f) for f in self.files)
+
+    def get_shape(self):
+        """Returns the shape (rows, columns) of the fields.
+
+        :rtype: Tuple(int, int)
+        """
+        return self.fields.shape[1:]
+
+    def _get_path(self, fname, version):
+        return join(self.cache_dir, fname.format(self.name, version))
+
+    def _exists(self, version):
+        # Checks whether the stacks of the version exist
+        if len(self.files) == 0:
+            return True
+        return isfile(self._get_path(field_cache_file, version)) and \
+            isfile(self._get_path(field_mask_file, version))
+
+    def _open(self):
+        # Maps the stacks of the current version
+        self.fields = self.mask = None
+        if len(self.files) > 0:
+            self.fields = load(self._get_path(field_cache_file, self.version),
+                               mmap_mode="r")
+            self.mask = load(self._get_path(field_mask_file, self.version),
+                             mmap_mode="r")
+
+    def _remove(self, version):
+        # Removes the stacks of an old version. A stack which is still
+        # mapped (e.g. on windows) is removed with the temp-folder.
+        for fname in (field_cache_file, field_mask_file):
+            fpath = self._get_path(fname, version)
+            if isfile(fpath):
+                try:
+                    remove(fpath)
+                except OSError, e:
+                    self.logger.debug(str(e))
+
+    def _load_manifest(self):
+        # Loads the stacked files of a previous session
+        fpath = join(self.cache_dir, field_manifest_file.format(self.name))
+        if not isfile(fpath):
+            return
+        try:
+            with open(fpath) as f:
+                data = jload(f)
+            self.files = data["files"]
+            self.version = data["version"]
+            if self._exists(self.version):
+                self._open()
+            else:
+                self.files = []
+        except (ValueError, KeyError, IOError), e:
+            self.logger.error(str(e))
+            self.files = []
+
+    def _save_manifest(self):
+        fpath = join(self.cache_dir, field_manifest_file.format(self.name))
+        with open(fpath, 'w') as f:
+            dump({"version": self.version, "files": self.files}, f)
+
+
+# caches of the field-series by their directory
+_caches = {}
+
+
+def get_field_cache(directory):
+    """Returns the updated cache of the field-series in the directory.
+
+    :param directory: Directory of the csv-files
+    :type directory: string
+    :rtype: FieldCache
+    :raises: ValueError
+    """
+    cache = _caches.get(directory)
+    if cache is None:
+        cache = _caches[directory] = FieldCache(directory)
+    cache.update()
+    return cache
@@ -0,0 +1,111 @@
+"""
+.. module: parallel_evaluation
+.. moduleauthor: Marcel Kennert
+
+The module evaluates the sensor-stencils on the cached field-stacks in a
+process-pool.
+"""
+from multiprocessing import Pool, cpu_count
+
+from numpy import load, add, empty
+
+
+# mapped stacks and stencil of the worker process
+_worker = {}
+
+
+def evaluate_chunk(stacks, indices, weights, starts, start, stop):
+    """
+    Evaluates the stencils on the fields of the images start to stop of
+    every stack. The value of a sensor is the difference of the averages
+    of its circles (see Sensor.get_average_values).
+
+    :param stacks: Stacks of the fields like (images, rows, columns)
+    :type stacks: List(ndarray)
+    :param indices: Flat indices of all stencils
+    :type indices: ndarray
+    :param weights: Weights of all stencils
+    :type weights: ndarray
+    :param starts: Start of the stencil of every sensor
+    :type starts: ndarray
+    :param start: Index of the first image
+    :type start: int
+    :param stop: Index after the last image
+    :type stop: int
+    :returns: Values like (images, stacks, sensors)
+    :rtype: ndarray
+    """
+    values = empty((stop - start, len(stacks), len(starts)))
+    for k, stack in enumerate(stacks):
+        flat = stack[start:stop].reshape(stop - start, -1)
+        values[:, k] = add.reduceat(flat[:, indices] * weights, starts,
+                                    axis=1)
+    return values
+
+
+def evaluate_series(paths, n, stencils, chunk_size=16, processes=None,
+                    callback=None):
+    """
+    Evaluates the stencils on the first n images of the stacks. The images
+    are split into chunks which are evaluated by a process-pool, the
+    results are gathered in the order of the images.
+
+    :param paths: Paths of the npy-stacks of the fields
+    :type paths: List(string)
+    :param n: Number of images
+    :type n: int
+    :param stencils: Stencils of the sensors
+    :type stencils: SensorStencils
+    :param chunk_size: Maximal number of images of a chunk
+    :type chunk_size: int
+    :param processes: Number of processes, None to use all cores
+    :type processes: int
+    :param callback: Function which gets the number of evaluated images
+    :type callback: function
+    :returns: Values like (images, stacks, sensors)
+    :rtype: ndarray
+    """
+    values = empty((n, len(paths), stencils.n))
+    if n == 0 or stencils.n == 0:
+        return values
+    if processes is None:
+        processes = cpu_count()
+    # smaller chunks if there are not enough chunks for all processes
+    size = max(1, min(chunk_size, -(-n // (4 * processes))))
+    jobs = [(start, min(start + size, n)) for start in range(0, n, size)]
+    args = (paths, stencils.indices, stencils.weights, stencils.starts)
+    processes = min(processes, len(jobs))
+    pool = None
+    if processes > 1:
+        pool = Pool(processes, _init_worker, args)
+        results = pool.imap_unordered(_evaluate_job, jobs)
+    else:
+        _init_worker(*args)
+        results = (_evaluate_job(job) for job in jobs)
+    done = 0
+    try:
+        for start, chunk in results:
+            values[start:start + len(chunk)] = chunk
+            done += len(chunk)
+            if callback is not None:
+                callback(done)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _worker.clear()
+    return values
+
+
+def _init_worker(paths, indices, weights, starts):
+    # Maps the stacks once for every worker process
+    _worker["stacks"] = [load(p, mmap_mode="r") for p in paths]
+    _worker["stencil"] = (indices, weights, starts)
+
+
+def _evaluate_job(job):
+    # Evaluates one chunk of images in the worker process
+    start, stop = job
+    indices, weights, starts = _worker["stencil"]
+    return start, evaluate_chunk(_worker["stacks"], indices, weights,
+                                 starts, start, stop)
@@ -2,15 +2,16 @@
 .. module: travel_sensor
 .. moduleauthor: Marcel Kennert
 """
-from decimal import Decimal
 from json import dump
 from json import load as jload
+from logging import getLogger
 from os.path import join, basename
 
 from PySide.QtCore import Qt
 from PySide.QtGui import QMainWindow
 from cv2 import imread, resize, imwrite
-from numpy import array, save, zeros, ogrid, load, loadtxt
+from numpy import array, save, ogrid, load, \
+    concatenate, full, dot, ravel_multi_index, nonzero, cumsum
 from pyface.image_resource import ImageResource
 from traits.api import HasTraits, List, Str, Int, Bool, Instance, Button
 from traitsui.api import Handler, UIInfo
@@ -21,9 +22,11 @@ from application.configuration import \
     displacement_u_dir, travel_sensor_images_dir, sensor_json,\
     displacement_v_dir, stylesheet_smrc, toolbar_background
 from application.configuration import travel_sensor_sensors_dir
+from basic_modules.basic_classes import RunThread, LRUCache
 from basic_modules.basic_dialogs import ProcessDialog, ErrorDialogs
-from basic_modules.basic_methods import get_all_files
+from basic_modules.basic_methods import get_all_files, clear_folder
 from experiment.correlation.draw_object.draw_methods import TravelSensorDraw
+from experiment.correlation.methods.field_cache import get_field_cache
 
 
 class Sensor(HasTraits):
@@ -41,6 +44,8 @@ class Sensor(HasTraits):
         self.values = []
         self.parent = None
         self.plot_color = None
+        # compiled measurement circles like (key, indices, weights)
+        self.stencil = None
 
     def append_values(self, values):
         """Appends values from a image to the values container.
@@ -99,29 +104,65 @@ class Sensor(HasTraits):
         :returns: Average values
         :rtype: float
         """
-        self.points = sorted(self.points, key=lambda tup: (tup[0], tup[1]))
-        p1, p2 = self.points
-        x1, y1 = p1
-        x2, y2 = p2
-        a1 = self.get_average(arr, y1, x1)
-        a2 = self.get_average(arr, y2, x2)
-        return float(a2 - a1)
-
-    def get_average(self, arr, y, x):
-        """Returns the average-value of the circle by the given positon."""
-        m, n = arr.shape[:2]
-        y, x = ogrid[-y:m - y, -x:n - x]
-        mask = x * x + y * y <= self.radius**2
-        array = zeros((m, n), dtype=bool)
-        array[mask] = 1
-        counter = Decimal(0.0)
-        s = Decimal(0.0)
-        for i in range(m):
-            for j in range(n):
-                if array[i, j] > 0:
-                    counter += Decimal(1.0)
-                    s += Decimal(arr[i, j])
-        return s / Decimal(counter)
+        indices, weights = self.get_stencil(arr.shape)
+        return float(dot(arr.ravel()[indices], weights))
+
+    def get_key(self):
+        """
+        Returns the definition of the sensor (the sorted points and the
+        radius). Sensors with the same key have the same values.
+
+        :rtype: Tuple
+        """
+        return (tuple(sorted(tuple(p) for p in self.points)), self.radius)
+
+    def get_stencil(self, shape):
+        """
+        Returns the flat indices and the weights of both circles for fields
+        of the given shape. The weighted sum of the values of a field is
+        the difference of the averages of the circles. The stencil is
+        compiled once and reused as long as the points, the radius and the
+        shape do not change.
+
+        :param shape: Shape of the fields
+        :type shape: Tuple(int, int)
+        :returns: Indices, weights
+        :rtype: Tuple(ndarray, ndarray)
+        :raises: ValueError
+        """
+        key = (tuple(shape[:2]), self.get_key())
+        if self.stencil is None or self.stencil[0] != key:
+            (x1, y1), (x2, y2) = key[1][0]
+            i1 = self.get_circle(shape, y1, x1)
+            i2 = self.get_circle(shape, y2, x2)
+            weights = concatenate((full(len(i1), -1. / len(i1)),
+                                   full(len(i2), 1. / len(i2))))
+            self.stencil = (key, concatenate((i1, i2)), weights)
+        return self.stencil[1:]
+
+    def get_circle(self, shape, y, x):
+        """Returns the flat indices of the circle by the given position.
+
+        :param shape: Shape of the field
+        :type shape: Tuple(int, int)
+        :param y: Row of the center
+        :type y: int
+        :param x: Column of the center
+        :type x: int
+        :returns: Flat indices of the field
+        :rtype: ndarray
+        :raises: ValueError
+        """
+        m, n = shape[:2]
+        r = self.radius
+        y0, y1 = max(y - r, 0), min(y + r + 1, m)
+        x0, x1 = max(x - r, 0), min(x + r + 1, n)
+        dy, dx = ogrid[y0 - y:y1 - y, x0 - x:x1 - x]
+        rows, cols = nonzero(dx * dx + dy * dy <= r * r)
+        if len(rows) == 0:
+            raise ValueError("The circle of {0} contains no values"
+                             .format(self.name))
+        return ravel_multi_index((rows + y0, cols + x0), (m, n))
 
     def __str__(self, *args, **kwargs):
         return "Name: {0}".format(self.name)
@@ -143,6 +184,32 @@ class Sensor(HasTraits):
     )
 
 
+class SensorStencils(object):
+    """
+    Stencils of several sensors for one field shape. All sensors are
+    evaluated on a field with one gather of the values (see
+    parallel_evaluation.evaluate_chunk), so the costs per field only
+    depend on the size of the circles.
+    """
+
+    def __init__(self, sensors, shape):
+        """
+        :param sensors: Sensors to evaluate
+        :type sensors: List(Sensor)
+        :param shape: Shape of the fields
+        :type shape: Tuple(int, int)
+        :raises: ValueError
+        """
+        self.shape = tuple(shape[:2])
+        stencils = [s.get_stencil(shape) for s in sensors]
+        self.n = len(stencils)
+        if self.n > 0:
+            self.indices = concatenate([i for i, _ in stencils])
+            self.weights = concatenate([w for _, w in stencils])
+            # start of the stencil of every sensor
+            self.starts = cumsum([0] + [len(i) for i, _ in stencils[:-1]])
+
+
 class SensorHandler(Handler):
     """Handles the interaction with the SMRCModel and the SMRCWindow."""
 
@@ -171,6 +238,11 @@ class SensorDialog(HasTraits):
 
     radius = Int(0)
 
+    # decoded images of the series by their index
+    frames = Instance(LRUCache, (32,))
+
+    logger = getLogger("Application")
+
     def open_dialog(self, sensors):
         """Opens a dialog to set the sensors.
 
@@ -181,70 +253,155 @@ class SensorDialog(HasTraits):
         """
         self.sensors = sensors
         self.update_storage_properties()
-        self.fname = self.images[self.cur_image_number]
-        self.ref_image = ImageResource(
-            join(travel_sensor_draw_images_dir, self.fname))
+        self.show_image()
         self.configure_traits(kind="livemodal")
         return self.sensors
 
+    def set_sensors(self, sensors):
+        """Sets the sensors which are drawn on the images.
+
+        :param sensors: New sensors of the dialog
+        :type sensors: List(Sensor)
+        """
+        del self.sensors[:]
+        for s in sensors:
+            self.sensors.append(s)
+
     def update_storage_properties(self):
         self.images = get_all_files(images_dir)
         self.max_image_number = len(self.images)
-        n = len(get_all_files(travel_sensor_draw_images_dir))
+        n = len(get_all_files(travel_sensor_images_dir))
         if not n == self.max_image_number:
             self.set_images()
 
     def set_images(self):
-        displacement = get_all_files(displacement_u_dir)[0]
-        w, h = loadtxt(
-            join(displacement_u_dir, displacement), delimiter=',').shape[:2]
+        w, h = get_field_cache(displacement_u_dir).get_shape()
         image_shape = (h, w)
+        self.frames.clear()
         for img_name in self.images:
             img = imread(join(images_dir, img_name))
             img = resize(img, image_shape)
             imwrite(join(travel_sensor_images_dir, img_name), img)
-            imwrite(join(travel_sensor_draw_images_dir, img_name), img)
 
     def reset_images(self):
-        for img_name in self.images:
-            img = imread(join(travel_sensor_images_dir, img_name))
-            imwrite(join(travel_sensor_draw_images_dir, img_name), img)
-        self.ref_image = ImageResource(
-            join(travel_sensor_draw_images_dir, self.fname))
+        clear_folder(travel_sensor_draw_images_dir)
+        self.show_image()
+
+    def get_frame(self, index):
+        """Returns the decoded image without the sensors.
+
+        :param index: Index of the image
+        :type index: int
+        :rtype: ndarray
+        """
+        img = self.frames.get(index)
+        if img is None:
+            img = imread(join(travel_sensor_images_dir, self.images[index]))
+            self.frames.put(index, img)
+        return img
+
+    def get_caches(self):
+        """
+        Returns the updated caches of the u- and v-displacements. The
+        caches are resolved once for every pass over the images, because
+        every update checks all files of the series.
+
+        :returns: Caches of the u- and v-displacements
+        :rtype: Tuple(FieldCache, FieldCache)
+        :raises: ValueError
+        """
+        return (get_field_cache(displacement_u_dir),
+                get_field_cache(displacement_v_dir))
+
+    def render_image(self, index, caches, img=None):
+        """Draws the sensors on the image and saves the drawn image.
+
+        :param index: Index of the image
+        :type index: int
+        :param caches: Caches of the u- and v-displacements (see get_caches)
+        :type caches: Tuple(FieldCache, FieldCache)
+        :param img: Image without the sensors (optional)
+        :type img: ndarray
+        :returns: Path of the drawn image
+        :rtype: string
+        """
+        if img is None:
+            img = self.get_frame(index)
+        img = img.copy()
+        if len(self.sensors) > 0:
+            udisp = caches[0].get_field(index)
+            vdisp = caches[1].get_field(index)
+            for t in self.sensors:
+                p1, p2 = t.points
+                x1, y1 = p1
+                x2, y2 = p2
+                u1, u2 = udisp[y1, x1], udisp[y2, x2]
+                v1, v2 = vdisp[y1, x1], vdisp[y2, x2]
+                img = self.sensor_draw.draw_travel_sensor(
+                    img, t, u1, u2, v1, v2)
+        fpath = join(travel_sensor_draw_images_dir, self.images[index])
+        imwrite(fpath, img)
+        return fpath
+
+    def show_image(self):
+        """
+        Draws the sensors only on the current image and shows it. The
+        neighbours of the image are decoded in the background.
+        """
+        index = self.cur_image_number
+        self.fname = self.images[index]
+        try:
+            self.ref_image = ImageResource(
+                self.render_image(index, self.get_caches()))
+        except Exception, e:
+            self.logger.error(str(e))
+            dialog = ErrorDialogs()
+            dialog.open_error("Some files are missing")
+            return
+        neighbours = [i for i in (index + 1, index - 1)
+                      if 0 <= i < self.max_image_number and
+                      i not in self.frames]
+        if neighbours:
+            RunThread(target=self._prefetch, args=(neighbours,))
 
     def update_images(self, sensors=None):
+        """
+        Draws the sensors on all images of the series (export of the drawn
+        images).
+
+        :param sensors: New sensors of the dialog (optional)
+        :type sensors: List(Sensor)
+        """
+        progress = None
         try:
             if sensors != None:
-                del self.sensors[:]
-                for s in sensors:
-                    self.sensors.append(s)
-            udisplacements = get_all_files(displacement_u_dir)
-            vdisplacements = get_all_files(displacement_v_dir)
+                self.set_sensors(sensors)
             progress = ProcessDialog(
-                max_n=self.max_image_number, title="Update")
+                max_n=self.max_image_number, title="Export")
+            caches = self.get_caches()
             for i in range(self.max_image_number):
                 img_name = self.images[i]
-                progress.update(i, msg="Update image: {0}".format(img_name))
-                udisp = loadtxt(join(displacement_u_dir, udisplacements[i]),
-                                delimiter=',')
-                vdisp = loadtxt(join(displacement_v_dir, vdisplacements[i]),
-                                delimiter=',')
-                img = imread(join(travel_sensor_images_dir, img_name))
-                for t in self.sensors:
-                    p1, p2 = t.points
-                    x1, y1 = p1
-                    x2, y2 = p2
-                    u1, u2 = udisp[y1, x1], udisp[y2, x2]
-                    v1, v2 = vdisp[y1, x1], vdisp[y2, x2]
-                    img = self.sensor_draw.draw_travel_sensor(
-                        img, t, u1, u2, v1, v2)
-                imwrite(join(travel_sensor_draw_images_dir, img_name), img)
+                progress.update(i, msg="Export image: {0}".format(img_name))
+                # the frames of the series would displace the cached frames
+                img = self.frames.get(i)
+                if img is None:
+                    img = imread(join(travel_sensor_images_dir, img_name))
+                self.render_image(i, caches, img)
             self.ref_image = ImageResource(
                 join(travel_sensor_draw_images_dir, self.fname))
         except Exception:
             dialog = ErrorDialogs()
             dialog.open_error("Some files are missing")
-        progress.close()
+        if progress is not None:
+            progress.close()
+
+    def _prefetch(self, indices):
+        # Decodes the images in the background
+        for index in indices:
+            try:
+                self.get_frame(index)
+            except Exception, e:
+                self.logger.debug(str(e))
 
     #=========================================================================
     # Traitsview + Traitsevents
@@ -260,9 +417,11 @@ class SensorDialog(HasTraits):
 
     button_previous = Button('Previous')
 
+    export_btn = Button("Export images")
+
     def _reset_btn_fired(self):
-        self.reset_images()
         del self.sensors[:]
+        self.reset_images()
 
     def _add_btn_fired(self):
         self.sensor_draw.draw(
@@ -272,6 +431,9 @@ class SensorDialog(HasTraits):
         t = Sensor(name, points)
         t.radius = self.radius
         self.sensors.append(t)
+        self.show_image()
+
+    def _export_btn_fired(self):
         self.update_images()
 
     def _button_next_fired(self):
@@ -285,14 +447,13 @@ class SensorDialog(HasTraits):
             self.cur_image_number = self.max_image_number - 1
         elif self.cur_image_number < 0:
             self.cur_image_number = 0
-        self.fname = self.images[self.cur_image_number]
-        self.ref_image = ImageResource(
-            join(travel_sensor_draw_images_dir, self.fname))
+        else:
+            self.show_image()
 
     def _radius_changed(self):
         for t in self.sensors:
             t.radius = self.radius
-        self.update_images()
+        self.show_image()
 
     icon = Image(ImageResource("../../icons/smrc_icon.png"))
 
@@ -312,6 +473,7 @@ class SensorDialog(HasTraits):
                     VGroup(
                         UItem("add_btn"),
                         UItem("reset_btn"),
+                        UItem("export_btn"),
                     ),
                     VGroup(
                         UItem('radius'),
@@ -0,0 +1,107 @@
+"""
+.. module: sensor_layout
+.. moduleauthor: Marcel Kennert
+
+The module places regular grids of sensors on the mask of the correlated
+values. Every layout is computed with numpy for all sensors at once and
+returns the points like (x1, y1, x2, y2), each as an array.
+"""
+from numpy import linspace, nonzero, argmax, meshgrid, concatenate
+
+
+def divide_interval(p1, p2, n):
+    """Divides the interval into n points with the same distance.
+
+    :param p1: Start-value of the interval
+    :type p1: int
+    :param p2: End-value of the interval
+    :type p2: int
+    :param n: Number of points
+    :type n: int
+    :returns: Rounded points of the interval
+    :rtype: ndarray
+    """
+    return linspace(p1, p2, n).round().astype(int)
+
+
+def get_extent(mask):
+    """Returns the bounding box of the values of the mask.
+
+    :param mask: Mask of the correlated values
+    :type mask: ndarray
+    :returns: First row, last row, first column, last column
+    :rtype: Tuple(int, int, int, int)
+    :raises: ValueError
+    """
+    rows = nonzero(mask.any(axis=1))[0]
+    cols = nonzero(mask.any(axis=0))[0]
+    if len(rows) == 0:
+        raise ValueError("The mask contains no values")
+    return rows[0], rows[-1], cols[0], cols[-1]
+
+
+def layout_lines(mask, n, horizontal=False, radius=0):
+    """
+    Places n parallel sensors over the whole specimen. The points of a
+    sensor are the first and the last value of its row (horizontal) or
+    its column (vertical), so the circles stay inside of the specimen.
+
+    :param mask: Mask of the correlated values
+    :type mask: ndarray
+    :param n: Number of sensors
+    :type n: int
+    :param horizontal: True for horizontal sensors, vertical otherwise
+    :type horizontal: Bool
+    :param radius: Radius of the circles of the sensors
+    :type radius: int
+    :returns: x1, y1, x2, y2
+    :rtype: Tuple(ndarray, ndarray, ndarray, ndarray)
+    :raises: ValueError
+    """
+    if not horizontal:
+        y1, x1, y2, x2 = layout_lines(mask.T, n, True, radius)
+        return x1, y1, x2, y2
+    top, bottom, _, _ = get_extent(mask)
+    ys = divide_interval(min(top + radius, bottom),
+                         max(bottom - radius, top), n)
+    lines = mask[ys]
+    width = lines.shape[1]
+    first = argmax(lines, axis=1) + radius
+    last = width - 1 - argmax(lines[:, ::-1], axis=1) - radius
+    # rows which are too short for the circles
+    valid = lines.any(axis=1) & (first < last)
+    return first[valid], ys[valid], last[valid], ys[valid]
+
+
+def layout_grid(mask, n, radius=0):
+    """
+    Places the nodes of a n x n grid over the bounding box of the specimen
+    and connects the neighbouring nodes with sensors in both directions.
+    Nodes outside of the specimen are skipped.
+
+    :param mask: Mask of the correlated values
+    :type mask: ndarray
+    :param n: Number of nodes in every direction
+    :type n: int
+    :param radius: Radius of the circles of the sensors
+    :type radius: int
+    :returns: x1, y1, x2, y2
+    :rtype: Tuple(ndarray, ndarray, ndarray, ndarray)
+    :raises: ValueError
+    """
+    top, bottom, left, right = get_extent(mask)
+    ys = divide_interval(min(top + radius, bottom),
+                         max(bottom - radius, top), n)
+    xs = divide_interval(min(left + radius, right),
+                         max(right - radius, left), n)
+    x, y = meshgrid(xs, ys)
+    inside = mask[y, x]
+    # horizontal and vertical connections of the neighbouring nodes
+    h = inside[:, :-1] & inside[:, 1:] & (x[:, :-1] < x[:, 1:])
+    v = inside[:-1] & inside[1:] & (y[:-1] < y[1:])
+    x1 = concatenate((x[:, :-1][h], x[:-1][v]))
+    y1 = concatenate((y[:, :-1][h], y[:-1][v]))
+    x2 = concatenate((x[:, 1:][h], x[1:][v]))
+    y2 = concatenate((y[:, 1:][h], y[1:][v]))
+    return x1, y1, x2, y2
+
@@ -59,9 +59,13 @@ class EvalMethods(HasTraits):
         self.log_informations(model)
         logger.debug("Start recording [EvalMethods]")
         model.started = model.measuring_card.started = True
+        model.measuring_card.start_acquisition()
         method = self.method.get_selected_value()
         logger.debug("Evaluation-type: " + self.method.selected_key)
-        method(model)
+        try:
+            method(model)
+        finally:
+            model.measuring_card.stop_acquisition()
         logger.debug("Experiment is finished [EvalMethods]")
         model.editor._reset_phases()
         model.handler._finished_experiment()
@@ -82,6 +82,7 @@ class ExperimentRecorder(HasTraits):
     def start(self):
         """Start the experiment."""
         self.recorder.reset(self.measuring_card.input_ports)
+        self.recorder.open_journal()
         RunThread(target=self._start_record)
 
     def _start_record(self):
@@ -89,7 +90,10 @@ class ExperimentRecorder(HasTraits):
         # must call in a own thread to avoid that the gui
         # is not usable
         RunThread(target=self.handler._update_values)
-        self.eval_methods.evaluate(model=self)
+        try:
+            self.eval_methods.evaluate(model=self)
+        finally:
+            self.recorder.close_journal()
         
 
     def use_all_ports(self, reset=True, reset_time=0.1):
@@ -109,11 +113,13 @@ class ExperimentRecorder(HasTraits):
         self.cur_image += 1
         self.measuring_card.trigger_all_ports(reset, reset_time)
         RunThread(target=self.handler._update_icon)
-        information = self.measuring_card.record_all_ports()
-        for info in information:
-            self.recorder.append(info, self.handler.get_time())
-        RunThread(target=self.recorder._update_plots)
-        RunThread(target=self.camera_handler.download_last_image)
+        snapshot = self.measuring_card.record_snapshot()
+        start_time = self.handler.get_start_time()
+        if start_time is None:
+            start_time = snapshot.time
+        self.recorder.append(snapshot.items(), snapshot.time - start_time)
+        self.recorder._update_plots()
+        self.camera_handler.download_last_image()
 
     #=========================================================================
     # Methods to save the experiment
@@ -181,7 +187,7 @@ class ExperimentRecorder(HasTraits):
         self.recorder.update_reference(f)
 
     def update_downloaded_preview(self, fpath):
-        self.recorder.images.append(fpath)
+        self.recorder.append_image(fpath)
         i = len(self.recorder.images) - 1
         self.recorder.update_image(i)
 
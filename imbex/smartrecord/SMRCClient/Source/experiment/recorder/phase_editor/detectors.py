@@ -0,0 +1,235 @@
+"""
+.. module: detectors
+.. moduleauthor: Marcel Kennert
+"""
+from Queue import Queue
+
+from numpy import flatnonzero
+
+from basic_modules.basic_methods import monotonic
+
+
+def first_index(condition):
+    """Returns the index of the first True-value or None.
+
+    :param condition: Boolean values
+    :type condition: ndarray
+    :rtype: int
+    """
+    index = flatnonzero(condition)
+    return index[0] if len(index) > 0 else None
+
+
+class Detector(object):
+    """
+    Base class for the detectors which evaluate the sample stream of the
+    acquisition. The acquisition calls update_samples with every new block
+    of samples, so the detector sees every sample and the phase thread can
+    wait on the queue instead of polling the measuring card. The samples
+    are delivered once per acquisition_period, which is therefore the
+    maximal detection latency (plus the time to copy the block).
+    """
+
+    def __init__(self, port_id, callback=None):
+        """
+        :param port_id: Id of the port which should evaluate
+        :type port_id: int
+        :param callback: Optional function which is called with the\
+            sampling time of every event in the thread of the acquisition
+        :type callback: function
+        """
+        self.port_id = port_id
+        self.callback = callback
+        self.column = None
+        self.finished = False
+        # sampling time of the detected events, None marks the end
+        self.queue = Queue()
+        self.max_latency = 0.
+
+    def attach(self, card):
+        """Registers the detector as listener of the acquisition.
+
+        :param card: Measuring card of the experiment
+        :type card: MeasuringCard
+        :raises: ValueError
+        """
+        ids = [p.id for p in card.input_ports]
+        if self.port_id not in ids:
+            raise ValueError("The given port does not exist")
+        self.column = ids.index(self.port_id)
+        card.acquisition.add_listener(self)
+
+    def detach(self, card):
+        """Removes the detector from the acquisition.
+
+        :param card: Measuring card of the experiment
+        :type card: MeasuringCard
+        """
+        card.acquisition.remove_listener(self)
+
+    def get_event(self, timeout=1.0):
+        """Blocks until the next event is detected.
+
+        :param timeout: Maximal time to wait
+        :type timeout: float
+        :returns: Sampling time of the event, None if the detection\
+            is finished
+        :rtype: float
+        :raises: Empty
+        """
+        return self.queue.get(timeout=timeout)
+
+    def stop(self):
+        """Finishes the detection and wakes up the waiting phase."""
+        self.finished = True
+        self.queue.put(None)
+
+    def update_samples(self, times, values):
+        """Evaluates a new block of samples.
+
+        :param times: Timestamps of the samples
+        :type times: ndarray
+        :param values: Values with the shape (samples, input ports)
+        :type values: ndarray
+        """
+        raise NotImplementedError()
+
+    def _fire(self, t):
+        # Informs the waiting phase about the event at the time t
+        self.max_latency = max(self.max_latency, monotonic() - t)
+        self.queue.put(t)
+        if self.callback is not None:
+            self.callback(t)
+
+
+class CrossingDetector(Detector):
+    """
+    Detects when the value of a port crosses the next level. After every
+    crossing the level moves by the ticks in the direction of the end
+    value. A raising detection finishes when the end value is reached,
+    a decreasing one when the last level below the end value is passed.
+    """
+
+    def __init__(self, port_id, level, ticks, end_value, raising=True,
+                 callback=None):
+        """
+        :param port_id: Id of the port which should evaluate
+        :type port_id: int
+        :param level: First level which must be crossed
+        :type level: float
+        :param ticks: Increment between the levels
+        :type ticks: float
+        :param end_value: End value of the detection
+        :type end_value: float
+        :param raising: True if the value raises, False otherwise
+        :type raising: bool
+        :param callback: Optional function which is called with the\
+            sampling time of every crossing
+        :type callback: function
+        """
+        super(CrossingDetector, self).__init__(port_id, callback)
+        self.level = level
+        self.ticks = ticks
+        self.end_value = end_value
+        self.raising = raising
+
+    def update_samples(self, times, values):
+        column = values[:, self.column]
+        pos, n = 0, len(column)
+        while pos < n and not self.finished:
+            if self.raising:
+                i = first_index(column[pos:] > self.level)
+                j = first_index(column[pos:] >= self.end_value)
+                if i is not None and (j is None or i <= j):
+                    self._fire(times[pos + i])
+                    self.level += self.ticks
+                    if i == j:
+                        self.stop()
+                    pos += i + 1
+                elif j is not None:
+                    self.stop()
+                else:
+                    return
+            else:
+                i = first_index(column[pos:] < self.level)
+                if i is None:
+                    return
+                self._fire(times[pos + i])
+                self.level -= self.ticks
+                if self.level <= self.end_value - self.ticks:
+                    self.stop()
+                pos += i + 1
+
+
+class HoldDetector(Detector):
+    """
+    Detects when the value of a port stays for a time window below (or
+    above) a limit. The samples are evaluated with their timestamps, so
+    the detection ends at the first sample which completes the window.
+    With a hysteresis the condition is left only when the value passes
+    the limit by the hysteresis. Violations which are shorter than the
+    debounce time do not restart the window.
+    """
+
+    def __init__(self, port_id, limit, smaller, window, debounce=0.,
+                 hysteresis=0., callback=None):
+        """
+        :param port_id: Id of the port which should evaluate
+        :type port_id: int
+        :param limit: Limit of the value
+        :type limit: float
+        :param smaller: True if the value must be smaller than the limit,\
+            False if it must be greater
+        :type smaller: bool
+        :param window: Time (in seconds) the condition must hold
+        :type window: float
+        :param debounce: Time (in seconds) a violation is ignored
+        :type debounce: float
+        :param hysteresis: Distance to the limit to leave the condition
+        :type hysteresis: float
+        :param callback: Optional function which is called with the\
+            sampling time when the window is completed
+        :type callback: function
+        """
+        super(HoldDetector, self).__init__(port_id, callback)
+        self.limit = limit
+        self.smaller = smaller
+        self.window = window
+        self.debounce = debounce
+        self.hysteresis = hysteresis
+        self.active = False
+        self.hold_start = None
+        self.violation_start = None
+
+    def update_samples(self, times, values):
+        if self.finished:
+            return
+        column = values[:, self.column]
+        if self.smaller:
+            enter = column < self.limit
+            leave = column >= self.limit + self.hysteresis
+        else:
+            enter = column > self.limit
+            leave = column <= self.limit - self.hysteresis
+        # nothing changes while the condition is not met
+        if not self.active and self.hold_start is None and not enter.any():
+            return
+        for t, e, l in zip(times.tolist(), enter.tolist(), leave.tolist()):
+            if self.active:
+                if l:
+                    self.active = False
+                    self.violation_start = t
+            elif e:
+                self.active = True
+                if self.violation_start is None or self.hold_start is None:
+                    self.hold_start = t
+                self.violation_start = None
+            if not self.active and self.hold_start is not None and \
+                    t - self.violation_start >= self.debounce:
+                self.hold_start = None
+            # the window completes only while the condition holds
+            if self.active and self.hold_start is not None and \
+                    t - self.hold_start >= self.window:
+                self._fire(t)
+                self.stop()
+                return
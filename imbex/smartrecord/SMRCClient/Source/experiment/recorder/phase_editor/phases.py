@@ -4,9 +4,8 @@
 """
 import warnings
 warnings.filterwarnings("ignore")
-from time import time, sleep
+from Queue import Empty
 
-from UniversalLibrary.UniversalLibrary import UniversalLibraryError
 from traits.api import \
     HasTraits, Float, Str, Bool, Int, Button, on_trait_change, Instance
 from traitsui.api import View, Item, VGroup, HGroup, spring, UItem, Group
@@ -14,6 +13,9 @@ from traitsui.menu import Action, CancelButton
 
 from basic_modules.basic_classes import Combobox
 from basic_modules.basic_methods import secs_to_time
+from experiment.recorder.phase_editor.detectors import \
+    CrossingDetector, HoldDetector
+from experiment.recorder.phase_editor.scheduler import DeadlineScheduler
 
 
 class Phase(HasTraits):
@@ -39,6 +41,9 @@ class Phase(HasTraits):
 
     record_mode = Bool(False)
 
+    # detector which evaluates the samples while the phase is running
+    detector = None
+
     def __init__(self, experiment, name, reset=True, reset_time=0.1):
         """
         :param experiment: Belonging experiment.
@@ -75,6 +80,8 @@ class Phase(HasTraits):
         """Cancel the phase."""
         self.started = False
         self.canceled = True
+        if self.detector is not None:
+            self.detector.stop()
 
     def reset_phase(self):
         """Reset the phase."""
@@ -82,6 +89,26 @@ class Phase(HasTraits):
         self.stopped = False
         self.canceled = False
 
+    def _run_detector(self, detector, action=None):
+        # Executes the action at every event of the detector until the
+        # detection is finished. The thread sleeps until the acquisition
+        # delivers an event.
+        card = self.model.measuring_card
+        self.detector = detector
+        detector.attach(card)
+        try:
+            while not self.canceled:
+                try:
+                    if detector.get_event() is None:
+                        break
+                except Empty:
+                    continue
+                if action is not None:
+                    action()
+        finally:
+            detector.detach(card)
+            self.detector = None
+
     #=========================================================================
     # Methods to save and load the phase
     #=========================================================================
@@ -183,13 +210,13 @@ class PhaseValue(Phase):
         :type reset: bool
         :param reset_time: Time to pass until reset the value (in seconds).
         :type reset_time: float
-        :raises: UniversalLibraryError
+        :raises: ValueError
         """
         super(PhaseValue, self).__init__(experiment, name=name,
                                          reset=True, reset_time=0.1)
         if experiment.record_mode and \
                 not experiment.measuring_card.input_port_exists(port_id):
-            raise UniversalLibraryError(0)
+            raise ValueError("The given port does not exist")
         self.id = port_id
         self.edit_dialog = edit_dialog
         self.start_value = start_value
@@ -211,29 +238,31 @@ class PhaseValue(Phase):
 
     def _start_raise(self, first_record):
         # phase where the force raise
-        value = self.model.measuring_card.record_port(self.id)[1]
+        acquisition = self.model.measuring_card.acquisition
+        value = acquisition.get_snapshot().get_value(self.id)
+        if value >= self.end_value:
+            return
         uptick = self.start_value if first_record else self.start_value + \
             self.ticks
-        while value < self.end_value and not self.canceled:
-            value = self.model.measuring_card.record_port(
-                self.id)[1]
-            if value > uptick:
-                uptick += self.ticks
-                self.model.use_all_ports(self.reset, self.reset_time)
+        detector = CrossingDetector(self.id, uptick, self.ticks,
+                                    self.end_value, True)
+        self._run_detector(detector, self._record)
 
     def _start_decrease(self, first_record):
         # phase where the force decrease
-        value = self.model.measuring_card.record_port(self.id)[1]
         if first_record:
             downtick = self.start_value
         else:
             downtick = self.start_value - self.ticks
-        while downtick > self.end_value - self.ticks and not self.canceled:
-            value = self.model.measuring_card.record_port(
-                self.id)[1]
-            if value < downtick:
-                downtick -= self.ticks
-                self.model.use_all_ports(self.reset, self.reset_time)
+        if downtick <= self.end_value - self.ticks:
+            return
+        detector = CrossingDetector(self.id, downtick, self.ticks,
+                                    self.end_value, False)
+        self._run_detector(detector, self._record)
+
+    def _record(self):
+        # records all ports at a crossing
+        self.model.use_all_ports(self.reset, self.reset_time)
 
     #=========================================================================
     # Methods to save and load the phase
@@ -469,16 +498,21 @@ class PhaseTime(Phase):
         self.ticks = ticks
         self.interval_str = interval_str
         self.ticks_str = ticks_str
+        # scheduler of the last run with the timing of the shots
+        self.scheduler = None
 
     def start(self):
         """Start the phase."""
         self.started = True
-        start_time = time()
-        while time() - start_time <= self.interval:
-            sleep(self.ticks)
-            self.model.use_all_ports(self.reset, self.reset_time)
-            if self.canceled:
-                return
+        self.scheduler = DeadlineScheduler(self.ticks, self.interval)
+        self.scheduler.run(
+            lambda: self.model.use_all_ports(self.reset, self.reset_time))
+
+    def cancel(self):
+        """Cancel the phase."""
+        super(PhaseTime, self).cancel()
+        if self.scheduler is not None:
+            self.scheduler.cancel()
 
     #=========================================================================
     # Methods to save and load the phase
@@ -673,8 +707,35 @@ class PhasePause(Phase):
 
     time = Int()
 
+    debounce = Float(0.)
+
+    hysteresis = Float(0.)
+
     def __init__(self, experiment, edit_dialog, limit, smaller, time,
-                 port_id, name, reset=True, reset_time=0.1):
+                 port_id, name, reset=True, reset_time=0.1, debounce=0.,
+                 hysteresis=0.):
+        """
+        :param experiment: Belonging experiment.
+        :type experiment: Experiment
+        :param edit_dialog: Dialog to edit the phase
+        :type edit_dialog: DialogPhaseInter
+        :param limit: Limit of the value
+        :type limit: float
+        :param smaller: True if the value must be smaller than the limit
+        :type smaller: bool
+        :param time: Time (in seconds) the value must keep the limit
+        :type time: int
+        :param port_id: Id of the port which should evaluate.
+        :type port_id: int
+        :param name: Name of the phase.
+        :type name: str
+        :param debounce: Time (in seconds) a violation of the limit\
+            is ignored
+        :type debounce: float
+        :param hysteresis: Distance to the limit to restart the time
+        :type hysteresis: float
+        :raises: ValueError
+        """
         super(PhasePause, self).__init__(experiment, name=name,
                                          reset=True, reset_time=0.1)
         if experiment.record_mode and \
@@ -685,6 +746,8 @@ class PhasePause(Phase):
         self.smaller = smaller
         self.limit = limit
         self.time = time
+        self.debounce = debounce
+        self.hysteresis = hysteresis
 
     #=========================================================================
     # Methods to save and load the phase
@@ -693,23 +756,9 @@ class PhasePause(Phase):
     def start(self):
         """Start the phase."""
         self.started = True
-        self.counter = 0
-        while not self.canceled:
-            value = self.model.measuring_card.record_port(self.id)[1]
-            if self.smaller:
-                if value < self.limit:
-                    self.counter += 1
-                    sleep(1)
-                else:
-                    self.counter = 0
-            else:
-                if value > self.limit:
-                    self.counter += 1
-                    sleep(1)
-                else:
-                    self.counter = 0
-            if self.counter >= self.time:
-                break
+        self._run_detector(HoldDetector(self.id, self.limit, self.smaller,
+                                        self.time, self.debounce,
+                                        self.hysteresis))
 
     #=========================================================================
     # Methods to save and load the phase
@@ -728,7 +777,9 @@ class PhasePause(Phase):
                 'limit': self.limit,
                 'smaller': self.smaller,
                 'time': self.time,
-                'port_id': self.id
+                'port_id': self.id,
+                'debounce': self.debounce,
+                'hysteresis': self.hysteresis
                 }
 
     @staticmethod
@@ -748,7 +799,9 @@ class PhasePause(Phase):
             edit_dialog = None
         return PhasePause(experiment, edit_dialog, args['limit'],
                           args['smaller'], args['time'], args['port_id'],
-                          args['name'], args['reset'], args['reset_time'])
+                          args['name'], args['reset'], args['reset_time'],
+                          args.get('debounce', 0.),
+                          args.get('hysteresis', 0.))
     #=========================================================================
     # Traitsview + Traitsevent
     #=========================================================================
@@ -758,7 +811,8 @@ class PhasePause(Phase):
     def _edit_btn_fired(self):
         # not finished yet
         args = [self.limit, self.smaller, self.time, self.id,
-                self.name, self.reset, self.reset_time]
+                self.name, self.reset, self.reset_time, self.debounce,
+                self.hysteresis]
         self.edit_dialog._update_attributes(args)
         n = self.parent.get_length_of_phases()
         ports = self.parent.get_ports()
@@ -766,7 +820,8 @@ class PhasePause(Phase):
         if confirm:
             args = self.edit_dialog._get_attributes()
             self.limit, self.smaller, self.time, self.id,\
-                self.name, self.reset, self.reset_time = args
+                self.name, self.reset, self.reset_time, self.debounce,\
+                self.hysteresis = args
             # not zero based
             pos = self.edit_dialog.position.get_selected_value() - 1
             self.parent.update_phases(self, pos)
@@ -778,6 +833,8 @@ class PhasePause(Phase):
             Item('limit', style='readonly'),
             Item('time', label='Time [s]:',  style='readonly'),
             Item('smaller',  style='readonly'),
+            Item('debounce', label='Debounce [s]:', style='readonly'),
+            Item('hysteresis', style='readonly'),
             HGroup(
                 spring,
                 UItem('edit_btn', visible_when='editable')
@@ -802,6 +859,10 @@ class DialogPhaseInter(DialogPhase):
 
     time = Int
 
+    debounce = Float(0.)
+
+    hysteresis = Float(0.)
+
     #=========================================================================
     # Methods to handle the dialog with other classes
     #=========================================================================
@@ -833,12 +894,14 @@ class DialogPhaseInter(DialogPhase):
         # Return all attributes of the view.
         pid = self.id.get_selected_value()
         return self.limit, self.smaller, self.time, pid,\
-            self.name, self.reset, self.reset_time
+            self.name, self.reset, self.reset_time, self.debounce,\
+            self.hysteresis
 
     def _update_attributes(self, args):
         # update the attributes of the view
         self.limit, self.smaller, self.time, pid,\
-            self.name, self.reset, self.reset_time = args
+            self.name, self.reset, self.reset_time, self.debounce,\
+            self.hysteresis = args
         self.id.show_value(pid)
 
     #=========================================================================
@@ -847,7 +910,7 @@ class DialogPhaseInter(DialogPhase):
 
     ConfirmButton = Action(name='OK', enabled_when='not error')
 
-    @on_trait_change('name,id,time,limit')
+    @on_trait_change('name,id,time,limit,debounce,hysteresis')
     def _check_phase(self):
         # Checks whether the given attributes are correctly.
         try:
@@ -856,6 +919,9 @@ class DialogPhaseInter(DialogPhase):
                     raise ValueError("The name does already exists")
             if self.time < 1:
                 raise ValueError('The time must positive')
+            elif self.debounce < 0 or self.hysteresis < 0:
+                raise ValueError('The debounce and the hysteresis '
+                                 'must not be negative')
             PhasePause(self.model, self, *self._get_attributes())
             self.error = False
         except Exception, e:
@@ -871,6 +937,8 @@ class DialogPhaseInter(DialogPhase):
                 Item('limit'),
                 Item('time'),
                 Item('smaller'),
+                Item('debounce', label='Debounce [s]'),
+                Item('hysteresis'),
             ),
             Group(
                 UItem('error_msg', style='readonly'),
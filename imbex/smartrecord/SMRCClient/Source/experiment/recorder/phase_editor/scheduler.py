@@ -0,0 +1,128 @@
+"""
+.. module: scheduler
+.. moduleauthor: Marcel Kennert
+"""
+from logging import getLogger
+from time import time, sleep
+
+from basic_modules.basic_methods import monotonic
+
+
+class Shot(object):
+    """Planned and actual time of one slot of the scheduler."""
+
+    def __init__(self, index, planned, actual, skipped=False):
+        """
+        :param index: Number of the slot (starts with 1)
+        :type index: int
+        :param planned: Planned time of the slot
+        :type planned: float
+        :param actual: Time when the action was executed, None if skipped
+        :type actual: float
+        :param skipped: True if the slot was skipped
+        :type skipped: bool
+        """
+        self.index = index
+        self.planned = planned
+        self.actual = actual
+        self.skipped = skipped
+
+    @property
+    def delay(self):
+        """Time between the planned and the actual time of the slot."""
+        return None if self.skipped else self.actual - self.planned
+
+    def __str__(self, *args, **kwargs):
+        return "Shot:" + str(self.__dict__)
+
+
+class DeadlineScheduler(object):
+    """
+    Executes an action at the absolute times start + k * ticks of a
+    monotonic clock. The deadlines do not depend on the duration of the
+    action, so the slots do not drift. If the action overruns one or more
+    slots they are executed directly one after another (catch_up) or
+    skipped and reported. The planned and actual times of all slots
+    are saved as shots in seconds since the epoch.
+    """
+
+    logger = getLogger("Application")
+
+    def __init__(self, ticks, interval, catch_up=False, cancel_period=0.5):
+        """
+        :param ticks: Time (in seconds) between two slots
+        :type ticks: float
+        :param interval: Time (in seconds) of the last slot after the start
+        :type interval: float
+        :param catch_up: True if overrun slots should execute immediately,\
+            False if they should skip
+        :type catch_up: bool
+        :param cancel_period: Maximal time (in seconds) to react on cancel
+        :type cancel_period: float
+        :raises: ValueError
+        """
+        if ticks <= 0:
+            raise ValueError("Invalid value: Ticks must be positive")
+        self.ticks = ticks
+        self.interval = interval
+        self.catch_up = catch_up
+        self.cancel_period = cancel_period
+        self.canceled = False
+        self.shots = []
+
+    def run(self, action):
+        """Executes the action in every slot until the interval is over.
+
+        :param action: Function without arguments
+        :type action: function
+        """
+        self.canceled = False
+        self.shots = []
+        start, start_wall = monotonic(), time()
+        n = int(self.interval / self.ticks)
+        k = 1
+        while k <= n and not self.canceled:
+            if not self._sleep_until(start + k * self.ticks):
+                return
+            action()
+            self.shots.append(Shot(k, start_wall + k * self.ticks,
+                                   start_wall + monotonic() - start))
+            if not self.catch_up:
+                # skip all slots which are already over
+                current = int((monotonic() - start) / self.ticks)
+                for i in range(k + 1, min(current, n) + 1):
+                    self.shots.append(Shot(i, start_wall + i * self.ticks,
+                                           None, True))
+                if current > k:
+                    self.logger.warning("Skipped {0} slot(s) [Scheduler]"
+                                        .format(min(current, n) - k))
+                k = max(k, current)
+            k += 1
+
+    def cancel(self):
+        """Stops the scheduler after the current slot."""
+        self.canceled = True
+
+    def get_skipped(self):
+        """Returns the number of skipped slots.
+
+        :rtype: int
+        """
+        return len([s for s in self.shots if s.skipped])
+
+    def get_max_delay(self):
+        """Returns the maximal delay of an executed slot in seconds.
+
+        :rtype: float
+        """
+        delays = [s.delay for s in self.shots if not s.skipped]
+        return max(delays) if delays else 0.
+
+    def _sleep_until(self, deadline):
+        # Sleeps until the deadline, returns False if canceled
+        while not self.canceled:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                return True
+            sleep(min(remaining, self.cancel_period))
+        return False
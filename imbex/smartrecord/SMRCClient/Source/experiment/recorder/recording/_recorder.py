@@ -6,7 +6,6 @@ from json import dump, load as jload
 from logging import getLogger
 from os.path import join
 
-from numpy import array
 from numpy import save, load
 from pyface.image_resource import ImageResource
 from traits.api import HasTraits, List, Instance, Bool
@@ -18,8 +17,10 @@ from application.configuration import \
     recorder_dir, recorder_file, images_dir
 from basic_modules.basic_classes import InstanceUItem
 from basic_modules.basic_methods import \
-    time_to_secs, secs_to_time, get_all_files
+    secs_to_time, get_all_files
 from camera.camera_interfaces import ICameraListener
+from experiment.recorder.recording.column_store import ColumnStore
+from experiment.recorder.recording.journal import Journal
 from experiment.recorder.recording.plotview import PlotView
 from experiment.recorder.recording.result_viewer import ResultViewer
 from measuring_card.ports import Port
@@ -40,7 +41,7 @@ class Recorder(HasTraits, ICameraListener):
 
     input_ports = List(Port)
 
-    container = List(List)
+    store = Instance(ColumnStore)
 
     record_information = List()
 
@@ -55,20 +56,38 @@ class Recorder(HasTraits, ICameraListener):
         self.record_mode = record_mode
         self.plotview.model = self
         self.result_viewer = ResultViewer(self)
+        self.store = ColumnStore([])
+        self.journal = Journal()
 
-    def append(self, info, rec):
-        """Appends new values to the recorder.
+    def append(self, information, rec):
+        """Appends the values of one recording to the recorder.
 
-        :param info: Values of the input ports.
-        :type info: List(Float)
-        :param rec: Recording time.
-        :type rec: str.
+        :param information: Values of the input ports like (port_id, value)
+        :type information: List(Tuple)
+        :param rec: Recording time in seconds since the start
+        :type rec: float
         """
-        pid, value = info
-        for i in range(self.n):
-            p = self.input_ports[i]
-            if p.id == pid:
-                self.container[i].append((rec, value))
+        self.store.append(rec, information)
+        if self.journal.opened:
+            self.journal.append_values(self.store.get_values()[-1])
+
+    def append_image(self, fpath):
+        """Appends a downloaded image to the recorder.
+
+        :param fpath: Path of the image
+        :type fpath: string
+        """
+        self.images.append(fpath)
+        if self.journal.opened:
+            self.journal.append_image(fpath)
+
+    def open_journal(self):
+        """Starts a new journal for the following recordings."""
+        self.journal.open(self.n + 1)
+
+    def close_journal(self):
+        """Writes the journal to the disk and closes it."""
+        self.journal.close()
 
     def reset(self, input_ports):
         """Reset all information of the recorder
@@ -77,25 +96,22 @@ class Recorder(HasTraits, ICameraListener):
         :type input_ports: List(Port)
         """
         del self.input_ports[:]
-        del self.container[:]
         del self.record_information[:]
         self.plotview.update_subplots(input_ports)
         self.n = len(input_ports)
         for i in range(self.n):
             self.input_ports.append(input_ports[i])
-            self.container.append([])
+        self.store = ColumnStore([p.id for p in input_ports])
 
     def get_values(self):
-        """Returns all recorded values"""
-        res = []
-        for i in range(len(self.container[0])):
-            row = []
-            for j in range(self.n):
-                rec, val = self.container[j][i]
-                row.append(val)
-            row.insert(0, time_to_secs(rec))
-            res.append(row)
-        return array(res)
+        """
+        Returns all recorded values without copying them. The first
+        column contains the time, the other columns the values of the
+        input ports.
+
+        :rtype: ndarray
+        """
+        return self.store.get_values()
 
     #=========================================================================
     # Update methods
@@ -109,11 +125,13 @@ class Recorder(HasTraits, ICameraListener):
         """
         self.index = index
         del self.record_information[:]
+        row = self.store.get_values()[index]
         for i in range(self.n):
-            rec, val = self.container[i][index]
-            label = '{0}: {1:.3f}'.format(self.input_ports[i].name, val)
+            label = '{0}: {1:.3f}'.format(self.input_ports[i].name,
+                                          row[i + 1])
             self.record_information.append(label)
-        self.record_information.append('Time: {0}'.format(rec))
+        self.record_information.append(
+            'Time: {0}'.format(secs_to_time(row[0])))
         if not self.show_reference:
             files = get_all_files(images_dir)
             self.update_reference(files[0])
@@ -138,8 +156,11 @@ class Recorder(HasTraits, ICameraListener):
 
     def save(self):
         self.logger.debug("Save recorded values [Recorder]")
-        Recorder.save_values(self.get_values())
+        # the mapped records are identical to the file
+        if not self.store.mapped:
+            Recorder.save_values(self.get_values())
         Recorder.save_images(self.images)
+        self.journal.mark_saved(len(self.store), len(self.images))
     
     @staticmethod
     def save_values(values):
@@ -159,16 +180,14 @@ class Recorder(HasTraits, ICameraListener):
         with open(join(recorder_dir, recorder_file), 'r') as f:
             data = jload(f)
         self.images = data["images"]
-        values = load(join(recorder_dir, recording_file))
+        # the evaluation maps the file instead of reading it, the mapped
+        # array is shared by the plots and the result viewer
+        mmap_mode = None if self.record_mode else "r"
+        values = load(join(recorder_dir, recording_file), mmap_mode=mmap_mode)
         self.reset(input_ports)
-        nv = len(values)
-        nip = len(input_ports)
-        self.plotview.update_subplots(input_ports)
-        self.plotview.update_values(values)
-        for i in range(nv):
-            t = secs_to_time(values[i, 0])
-            for j in range(nip):
-                self.container[j].append((t, values[i, j + 1]))
+        self.store = ColumnStore.from_values([p.id for p in input_ports],
+                                             values)
+        self.plotview.draw_values(self.get_values())
         self.result_viewer.show_images=False
         self._update_record_information(0)
         self.show_images=True
@@ -0,0 +1,134 @@
+"""
+.. module: column_store
+.. moduleauthor: Marcel Kennert
+"""
+from numpy import empty, memmap
+
+
+class ColumnStore(object):
+    """
+    Growable storage of the recorded values. Every record is one row
+    of a preallocated float64-array, the first column contains the time
+    and the other columns the values of the ports in the given order.
+    If the array is full the capacity doubles, so appending a record
+    takes amortized constant time.
+    """
+
+    def __init__(self, ids, capacity=1024):
+        """
+        :param ids: Ids of the ports in the order of the columns
+        :type ids: List(int)
+        :param capacity: Number of rows which are allocated first
+        :type capacity: int
+        """
+        self.ids = list(ids)
+        # column of every port id, the time is the column 0
+        self.columns = dict((pid, i + 1) for i, pid in enumerate(self.ids))
+        self.data = empty((max(capacity, 1), len(self.ids) + 1))
+        self.size = 0
+
+    @staticmethod
+    def from_values(ids, values):
+        """
+        Creates a store which uses the given records (e.g. a memory-mapped
+        array) without copying them. The records are copied into a new
+        array when the first record is appended.
+
+        :param ids: Ids of the ports in the order of the columns
+        :type ids: List(int)
+        :param values: Records with the time in the first column
+        :type values: ndarray
+        :returns: Store with the given records
+        :rtype: ColumnStore
+        :raises: ValueError
+        """
+        store = ColumnStore(ids, 1)
+        if len(values) == 0:
+            return store
+        if values.ndim != 2 or values.shape[1] != store.data.shape[1]:
+            raise ValueError("The number of columns does not match")
+        store.data = values
+        store.size = len(values)
+        return store
+
+    @property
+    def mapped(self):
+        """True if the records are still the memory-mapped records"""
+        return isinstance(self.data, memmap)
+
+    def __len__(self):
+        return self.size
+
+    def append(self, t, information):
+        """Appends a new record.
+
+        :param t: Recording time in seconds
+        :type t: float
+        :param information: Values of the ports like (port_id, value)
+        :type information: List(Tuple)
+        :raises: ValueError
+        """
+        if self.size == len(self.data):
+            self._grow(max(2 * len(self.data), 1))
+        row = self.data[self.size]
+        row[1:] = float("nan")
+        row[0] = t
+        for pid, value in information:
+            try:
+                row[self.columns[pid]] = value
+            except KeyError:
+                raise ValueError("The given id not exists.")
+        self.size += 1
+
+    def extend(self, values):
+        """Appends several records at once.
+
+        :param values: Records with the time in the first column
+        :type values: ndarray
+        :raises: ValueError
+        """
+        if len(values) == 0:
+            return
+        if values.shape[1] != self.data.shape[1]:
+            raise ValueError("The number of columns does not match")
+        size = self.size + len(values)
+        if size > len(self.data):
+            self._grow(max(size, 2 * len(self.data)))
+        self.data[self.size:size] = values
+        self.size = size
+
+    def get_values(self):
+        """
+        Returns all records without copying them. The returned array is
+        a view of the storage and must not be changed.
+
+        :rtype: ndarray
+        """
+        return self.data[:self.size]
+
+    def get_column(self, pid):
+        """Returns the recorded values of the port by the given id.
+
+        :param pid: Id of the port
+        :type pid: int
+        :rtype: ndarray
+        :raises: ValueError
+        """
+        try:
+            return self.data[:self.size, self.columns[pid]]
+        except KeyError:
+            raise ValueError("The given id not exists.")
+
+    def get_times(self):
+        """Returns the recording times in seconds.
+
+        :rtype: ndarray
+        """
+        return self.data[:self.size, 0]
+
+    def _grow(self, capacity):
+        # Copies the records into a greater array. Views of the old
+        # array remain valid.
+        data = empty((capacity, self.data.shape[1]))
+        data[:self.size] = self.data[:self.size]
+        self.data = data
@@ -0,0 +1,286 @@
+"""
+.. module: journal
+.. moduleauthor: Marcel Kennert
+"""
+from datetime import datetime
+from json import dump, load
+from logging import getLogger
+from os import fsync, remove, makedirs, walk
+from os.path import join, isfile, getsize, relpath
+from struct import Struct
+from threading import Lock, Event
+from zipfile import ZipFile, ZIP_DEFLATED
+
+from numpy import fromfile, empty, save
+
+from application.configuration import \
+    journal_dir, recovery_dir, journal_values_file, journal_images_file, \
+    journal_saved_file, recording_file, recorder_file, recorder_dir, \
+    ext_pairs, project_ext
+from basic_modules.basic_classes import RunThread
+
+
+# magic, version and number of columns of the values journal
+HEADER = Struct("<4sII")
+
+MAGIC = "SMRJ"
+
+VERSION = 1
+
+
+class Journal(object):
+    """
+    Append-only journal of the recorded values. Every recording is
+    written as a fixed-size record of float64 values (time and the
+    values of the input ports), the paths of the downloaded images are
+    written line by line into a second file. Every record is flushed to
+    the operating system when it is appended, a background thread syncs
+    the files to the disk every sync_interval seconds, so the cost of
+    every record stays constant. After a crash the records of the
+    journal can be recovered with recover_journal.
+    """
+
+    logger = getLogger("Application")
+
+    def __init__(self, directory=journal_dir, sync_interval=1.0):
+        """
+        :param directory: Directory of the journal files
+        :type directory: string
+        :param sync_interval: Maximal time (in seconds) until a sync
+        :type sync_interval: float
+        """
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.values_file = None
+        self.images_file = None
+        self.columns = 0
+        # the values and the images are written by different threads
+        self.lock = Lock()
+        self.unsynced = 0
+        # stops the sync-thread of the opened journal
+        self.stopped = None
+
+    @property
+    def opened(self):
+        """True if the journal is opened for writing"""
+        return self.values_file is not None
+
+    def open(self, columns):
+        """Starts a new journal, an existing journal is discarded.
+
+        :param columns: Number of values of every record
+        :type columns: int
+        """
+        self.close()
+        self.logger.debug("Open journal [Journal]")
+        self.columns = columns
+        saved = join(self.directory, journal_saved_file)
+        if isfile(saved):
+            remove(saved)
+        self.values_file = open(join(self.directory, journal_values_file),
+                                "wb")
+        self.images_file = open(join(self.directory, journal_images_file),
+                                "wb")
+        self.values_file.write(HEADER.pack(MAGIC, VERSION, columns))
+        self.sync()
+        self.stopped = Event()
+        RunThread(target=self._sync_loop, args=(self.stopped,))
+
+    def append_values(self, row):
+        """Appends the values of one recording.
+
+        :param row: Time and values of the input ports
+        :type row: ndarray
+        """
+        with self.lock:
+            self.values_file.write(row.astype("<f8").tostring())
+            self._written(self.values_file)
+
+    def append_image(self, fpath):
+        """Appends the path of a downloaded image.
+
+        :param fpath: Path of the image
+        :type fpath: string
+        """
+        with self.lock:
+            self.images_file.write(fpath.encode("utf-8") + "\n")
+            self._written(self.images_file)
+
+    def sync(self):
+        """Writes all records to the disk."""
+        with self.lock:
+            self._sync()
+
+    def _sync(self):
+        # Flushes the files to the disk. The lock must be acquired
+        # by the caller.
+        for f in (self.values_file, self.images_file):
+            if f is not None:
+                f.flush()
+                fsync(f.fileno())
+        self.unsynced = 0
+
+    def close(self):
+        """Syncs and closes the journal."""
+        if self.stopped is not None:
+            self.stopped.set()
+            self.stopped = None
+        with self.lock:
+            if not self.opened:
+                return
+            self._sync()
+            self.values_file.close()
+            self.images_file.close()
+            self.values_file = None
+            self.images_file = None
+
+    def mark_saved(self, n_values, n_images):
+        """
+        Saves the number of records which are saved in the project, so
+        they will not be recovered.
+
+        :param n_values: Number of saved recordings
+        :type n_values: int
+        :param n_images: Number of saved images
+        :type n_images: int
+        """
+        if not isfile(join(self.directory, journal_values_file)):
+            return
+        self.sync()
+        with open(join(self.directory, journal_saved_file), "w") as f:
+            dump({"values": n_values, "images": n_images}, f)
+            f.flush()
+            fsync(f.fileno())
+
+    def _written(self, f):
+        # Flushes the record to the operating system, so it survives a
+        # crash of the application. The sync-thread writes it to the disk.
+        f.flush()
+        self.unsynced += 1
+
+    def _sync_loop(self, stopped):
+        # Syncs the written records every sync_interval seconds
+        while not stopped.wait(self.sync_interval):
+            with self.lock:
+                if self.opened and self.unsynced > 0:
+                    self._sync()
+
+
+def read_journal(directory=journal_dir):
+    """Reads the records of the journal. A torn last record is ignored.
+
+    :param directory: Directory of the journal files
+    :type directory: string
+    :returns: Recorded values, paths of the images and the number of\
+        values and images which are already saved
+    :rtype: Tuple(ndarray, List(string), int, int)
+    :raises: ValueError
+    """
+    fpath = join(directory, journal_values_file)
+    with open(fpath, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("The journal has no header")
+        magic, version, columns = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("The journal has a unknown format")
+        n = (getsize(fpath) - HEADER.size) // (8 * columns)
+        values = fromfile(f, "<f8", n * columns).reshape(n, columns) \
+            if columns > 0 else empty((0, 0))
+    images = []
+    fpath = join(directory, journal_images_file)
+    if isfile(fpath):
+        with open(fpath, "rb") as f:
+            for line in f.read().split("\n")[:-1]:
+                images.append(line.decode("utf-8"))
+    n_values, n_images = 0, 0
+    fpath = join(directory, journal_saved_file)
+    if isfile(fpath):
+        with open(fpath, "r") as f:
+            saved = load(f)
+        n_values, n_images = saved["values"], saved["images"]
+    return values, images, n_values, n_images
+
+
+def recover_journal(directory=journal_dir, target=recovery_dir):
+    """
+    Rebuilds the recordings and the recorded images of a journal which
+    contains unsaved records (e.g. after a crash). The files are saved
+    in a new folder of the target directory together with a project of
+    the recovered recordings and the files of the last session in the
+    temp-folder (images, measuring card, phases, ...). The journal is
+    removed, so it must be called before the temp-folder is cleared.
+
+    :param directory: Directory of the journal files
+    :type directory: string
+    :param target: Directory to save the recovered files
+    :type target: string
+    :returns: Path of the recovered project (the folder, if the project\
+        could not be saved), None if nothing was recovered
+    :rtype: string
+    """
+    logger = getLogger("Application")
+    if not isfile(join(directory, journal_values_file)):
+        return None
+    try:
+        values, images, n_values, n_images = read_journal(directory)
+    except (ValueError, IOError), e:
+        logger.error("Can not read the journal: {0}".format(e))
+        return None
+    project = None
+    if len(values) > n_values or len(images) > n_images:
+        name = datetime.now().strftime("%Y%m%d_%H%M%S")
+        folder = join(target, name)
+        makedirs(folder)
+        # same files as Recorder.save
+        save(join(folder, recording_file), values)
+        with open(join(folder, recorder_file), "w") as f:
+            dump({"images": images}, f, indent=2)
+        try:
+            project = _save_project(folder, name)
+        except (IOError, OSError), e:
+            logger.error("Can not save the recovered project: {0}".format(e))
+            project = folder
+        logger.warning("Recovered {0} recordings and {1} images to {2}"
+                       .format(len(values), len(images), project))
+    for fname in (journal_values_file, journal_images_file,
+                  journal_saved_file):
+        if isfile(join(directory, fname)):
+            remove(join(directory, fname))
+    return project
+
+
+def _save_project(folder, name):
+    # Saves the recovered recordings with the files of the temp-folder
+    # like SMRCModel.save_project, so the project can be loaded again
+    parts = []
+    for d, ext in ext_pairs:
+        fpath = join(folder, "{0}{1}.zip".format(name, ext))
+        if d == recorder_dir:
+            _zip_files(folder, fpath, [recording_file, recorder_file])
+        else:
+            _zip_files(d, fpath)
+        parts.append(fpath)
+    project = join(folder, "{0}.{1}".format(name, project_ext))
+    zf = ZipFile(project, "w", ZIP_DEFLATED)
+    for fpath in parts:
+        zf.write(fpath, relpath(fpath, folder))
+    zf.close()
+    for fpath in parts:
+        remove(fpath)
+    return project
+
+
+def _zip_files(src_path, fpath, files=None):
+    # Zips the files of the folder (only the given files of the folder
+    # itself, if files is not None) with their relative paths
+    zf = ZipFile(fpath, "w", ZIP_DEFLATED)
+    if files is not None:
+        for f in files:
+            zf.write(join(src_path, f), f)
+    else:
+        for dirname, _, fnames in walk(src_path):
+            for f in fnames:
+                absname = join(dirname, f)
+                zf.write(absname, relpath(absname, src_path))
+    zf.close()
@@ -1,4 +1,7 @@
 import logging
+from math import ceil
+from threading import Lock, Timer
+from time import time
 
 from matplotlib.backends.backend_qt4agg import \
     FigureCanvasQTAgg as FigureCanvas
@@ -6,7 +9,8 @@ from matplotlib.backends.backend_qt4agg import \
     NavigationToolbar2QT as NavigationToolbar2QTAgg
 from matplotlib.figure import Figure
 from matplotlib.patches import Ellipse
-from numpy import amax, amin
+from numpy import amax, amin, arange, column_stack, concatenate, \
+    flatnonzero, sort, searchsorted
 from pyface.qt import QtGui
 from traits.api import HasTraits, List, Instance, Str
 from traits.etsconfig.api import ETSConfig
@@ -26,6 +30,32 @@ mpl.rcParams["backend.qt4"] = "PySide"
 mpl.use("Qt4Agg")
 
 
+def decimate(values, n_columns):
+    """
+    Reduces the values to the minimum and the maximum of every column,
+    so the shape of the plot is kept with at most 2*n_columns points.
+
+    :param values: Values which should plot
+    :type values: ndarray
+    :param n_columns: Number of columns (pixels) of the plot
+    :type n_columns: int
+    :returns: Indices and values of the kept points
+    :rtype: Tuple(ndarray, ndarray)
+    """
+    n = len(values)
+    n_columns = max(int(n_columns), 1)
+    if n <= 2 * n_columns:
+        return arange(n), values
+    size = n // n_columns
+    m = size * n_columns
+    blocks = values[:m].reshape(n_columns, size)
+    offsets = arange(n_columns) * size
+    indices = sort(column_stack((offsets + blocks.argmin(axis=1),
+                                 offsets + blocks.argmax(axis=1))), axis=1)
+    indices = concatenate((indices.ravel(), arange(m, n)))
+    return indices, values[indices]
+
+
 class PlotView(HasTraits):
     """
     Object to manage the plots of the experiment. The plot
@@ -37,9 +67,17 @@ class PlotView(HasTraits):
 
     logger = logging.getLogger("application")
 
+    # maximal number of redraws per second
+    max_fps = 5.
+
     def __init__(self):
         self.logger.debug("Initialize PlotView")
         self.model = None
+        self.lock = Lock()
+        self.draw_lock = Lock()
+        self.pending = None
+        self.timer = None
+        self.last_draw = 0.
         plot = Plot(self.model)
         plot.update_title(" ")
         self.plots.append(plot)
@@ -75,17 +113,45 @@ class PlotView(HasTraits):
         self.plots.append(plot)
 
     def update_values(self, values):
-        """Update all values of all plots.
+        """
+        Update all values of all plots without blocking the caller. The
+        updates are coalesced, so the plots are redrawn at most max_fps
+        times per second with the newest values.
+
+        :param values: Recorded values of the experiment
+        :type values: ndarray
+        """
+        with self.lock:
+            self.pending = values
+            if self.timer is not None:
+                return
+            delay = max(0., self.last_draw + 1. / self.max_fps - time())
+            self.timer = Timer(delay, self._draw_pending)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def draw_values(self, values):
+        """Update all values of all plots and redraw them immediately.
 
         :param values: Recorded values of the experiment
         :type values: ndarray
         """
-        for i in range(1, len(values[0])):
-            val = values[:, i]
-            try:
-                self.plots[i - 1].update_plot(val)
-            except IndexError:
-                pass
+        with self.draw_lock:
+            self.last_draw = time()
+            for i in range(1, values.shape[1]):
+                try:
+                    self.plots[i - 1].update_plot(values[:, i], values[:, 0])
+                except IndexError:
+                    pass
+
+    def _draw_pending(self):
+        # Draws the newest values which were given to update_values
+        with self.lock:
+            values = self.pending
+            self.pending = None
+            self.timer = None
+        if values is not None:
+            self.draw_values(values)
 
     def update_focus_point(self, index):
         for p in self.plots:
@@ -173,6 +239,10 @@ class Plot(HasTraits):
         self.ellipse_size = 6
         self.focus = False
         self.focus_circel = Ellipse((0.0, 0.0), 0.0, 0, color='r')
+        self.values = arange(0)
+        self.times = arange(0)
+        self.line = None
+        self.connected = False
 
     def update_title(self, title):
         """Update the title of the plot.
@@ -195,25 +265,73 @@ class Plot(HasTraits):
         self.axes.set_title(title)
         self.axes.grid(True)
 
-    def update_plot(self, values):
+    def update_plot(self, values, times=None):
         """Update the plots with the given values.
 
         :param values: Values which should plot
         :type values: ndarray
+        :param times: Recording times (in seconds) of the values,\
+            None to plot the values by their index
+        :type times: ndarray
         """
         self.values = values
-        self.figure.canvas.mpl_connect("button_press_event", self._onclick)
+        self.times = arange(len(values)) if times is None else times
+        if not self.connected:
+            self.figure.canvas.mpl_connect("button_press_event",
+                                           self._onclick)
+            self.connected = True
+        if self.line is None:
+            self.line, = self.axes.plot([], [], marker="o", linestyle='-',
+                                        markerfacecolor=toolbar_background,
+                                        linewidth=1)
+            self.axes.callbacks.connect("xlim_changed", self._update_line)
         if len(values) > self.xmax:
-            self.xmax += self.ticks
-            self.xmin += self.ticks
-            self.axes.set_xlim([self.xmin, self.xmax])
-        self.axes.plot(values, marker="o", linestyle='-',
-                       markerfacecolor=toolbar_background, linewidth=1)
+            # scrolls by whole ticks until the last value is visible, a
+            # coalesced redraw can add more than one tick of values
+            shift = int(ceil(float(len(values) - self.xmax) / self.ticks))
+            self.xmax += shift * self.ticks
+            self.xmin += shift * self.ticks
+            self.axes.set_xlim(self.get_window())
+        elif len(values) > 0 and self.times[-1] > self.axes.get_xlim()[1]:
+            # the estimated time of the window was too short
+            self.axes.set_xlim(self.get_window())
+        self._update_line()
         if not self.focus:
             self.axes.add_artist(self.focus_circel)
             self.focus = True
         self.figure.canvas.draw()
 
+    def get_window(self):
+        """
+        Returns the visible time interval of the recordings xmin to xmax.
+        The time of the recordings which are not recorded yet is estimated
+        by the mean time between two recordings.
+
+        :rtype: List(float)
+        """
+        n = len(self.times)
+        if n == 0:
+            return [self.xmin, self.xmax]
+        step = (self.times[-1] - self.times[0]) / (n - 1) if n > 1 else 0.
+        if step <= 0:
+            step = 1.
+        start = self.times[min(self.xmin, n - 1)]
+        end = self.times[-1] + (self.xmax - n + 1) * step
+        return [start, max(end, start + step)]
+
+    def _update_line(self, axes=None):
+        # Sets the visible part of the values as data of the line. Long
+        # ranges are decimated to the width of the axes in pixels.
+        xmin, xmax = self.axes.get_xlim()
+        start = max(searchsorted(self.times, xmin) - 1, 0)
+        end = min(searchsorted(self.times, xmax, "right") + 1,
+                  len(self.values))
+        start = min(start, end)
+        x, y = decimate(self.values[start:end], self.axes.bbox.width)
+        self.line.set_data(self.times[start:end][x], y)
+        self.axes.relim()
+        self.axes.autoscale_view(scalex=False)
+
     def plot(self, x, y, color, label=""):
         max_x = amax(x)
         min_x = amin(x)
@@ -227,17 +345,18 @@ class Plot(HasTraits):
         if n == 0:
             return
         x, y = event.xdata, event.ydata
+        if x is None or y is None:
+            return
         width, height = self.get_eps()
         self.focus_circel.width = width
         self.focus_circel.height = height
-        for i in range(n):
-            try:
-                if x - width < i and i < x + width and \
-                        y - height < self.values[i] and \
-                        self.values[i] < y + height:
-                    self.model._update_record_information(i)
-            except TypeError:
-                pass
+        # only the recordings near the click can be selected
+        start = searchsorted(self.times, x - width, "right")
+        end = max(searchsorted(self.times, x + width), start)
+        values = self.values[start:end]
+        selected = (y - height < values) & (values < y + height)
+        for i in flatnonzero(selected):
+            self.model._update_record_information(start + i)
 
     def get_eps(self):
         h = (amax(self.values) - amin(self.values))
@@ -245,14 +364,15 @@ class Plot(HasTraits):
             ymin, ymax = self.axes.get_ylim()
             h = (ymax - ymin)
         height = abs(h) / 100 * self.ellipse_size
-        width = 20 / 100. * (self.ellipse_size - 1)
+        xmin, xmax = self.axes.get_xlim()
+        width = (xmax - xmin) / 100. * (self.ellipse_size - 1)
         return width, height
 
     def update_focus_point(self, index):
         width, height = self.get_eps()
         self.focus_circel.width = width
         self.focus_circel.height = height
-        self.focus_circel.center = index, self.values[index]
+        self.focus_circel.center = self.times[index], self.values[index]
         self.figure.canvas.draw()
         if not self.focus:
             self.axes.add_artist(self.focus_circel)
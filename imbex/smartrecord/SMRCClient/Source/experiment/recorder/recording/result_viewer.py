@@ -22,7 +22,7 @@ from traitsui.editors.list_editor import ListEditor
 from application.configuration import resized_images_dir, \
     result_normal_dir, result_resized_dir,\
     strain_exx_img_file, strain_exy_img_file, strain_eyy_img_file, images_dir,\
-    travel_sensor_sensors_dir, recording_file, recorder_dir, stylesheet_smrc,\
+    travel_sensor_sensors_dir, stylesheet_smrc,\
     toolbar_background
 from basic_modules.basic_classes import Combobox
 from basic_modules.basic_methods import \
@@ -56,6 +56,9 @@ class TravelsensorGraph(HasTraits):
 
     force = []
 
+    # recorder which contains the recorded values
+    recorder = None
+
     x_axis = Instance(Combobox, ())
 
     y_axis = Instance(Combobox, ())
@@ -78,8 +81,7 @@ class TravelsensorGraph(HasTraits):
         for i in range(len(self.recorded_values)):
             val = self.recorded_values[i]
             if axis.selected_key == val:
-                arr = load(join(recorder_dir, recording_file))
-                res.append((None, arr[:, i]))
+                res.append((None, self.recorder.get_values()[:, i]))
                 return res
 
     def get_dic_values(self, axis):
@@ -184,6 +186,7 @@ class ResultViewer(HasTraits):
 
     def __init__(self, recorder):
         self.recorder = recorder
+        self.sensor_graph.recorder = recorder
         self.result_options.add_item(
             'recorded_image', self.show_recorded_image)
         self.result_options.add_item('strain-exx', self.show_strain_exx)
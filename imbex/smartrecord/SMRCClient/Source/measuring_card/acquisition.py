@@ -0,0 +1,148 @@
+"""
+.. module: acquisition
+.. moduleauthor: Marcel Kennert
+"""
+from collections import namedtuple
+from logging import getLogger
+from threading import Condition
+from time import sleep
+
+from basic_modules.basic_classes import RunThread
+
+
+class Snapshot(namedtuple("Snapshot", ["time", "ids", "values"])):
+    """
+    Immutable values of all input ports which were read at the
+    same instant. The ids and the values are tuples in the order
+    of the input ports of the measuring card.
+    """
+
+    def get_value(self, port_id):
+        """Returns the value of the port by the given port-id.
+
+        :param port_id: Id of the port.
+        :type port_id: int
+        :returns: Value of the port
+        :rtype: float
+        :raises: ValueError
+        """
+        try:
+            return self.values[self.ids.index(port_id)]
+        except ValueError:
+            raise ValueError("The given id not exists.")
+
+    def items(self):
+        """Returns the values as a list of tuples like (port_id, value)"""
+        return zip(self.ids, self.values)
+
+
+class Acquisition(object):
+    """
+    The acquisition is the only component which reads the input ports
+    of the measuring card while the experiment is running. It reads the
+    ports in a own thread and publishes the last values as a snapshot,
+    all other components take the snapshot instead of reading the
+    card by themselves. Listeners are informed about every new block
+    of samples.
+    """
+
+    logger = getLogger("Application")
+
+    def __init__(self, card):
+        """
+        :param card: Measuring card which should be read
+        :type card: MeasuringCard
+        """
+        self.card = card
+        self.running = False
+        self.snapshot = None
+        self.listeners = []
+        self.condition = Condition()
+
+    def start(self):
+        """Starts the thread which reads the ports."""
+        if self.running:
+            return
+        self.logger.debug("Start acquisition [Acquisition]")
+        self.snapshot = None
+        self.running = True
+        RunThread(target=self._run)
+
+    def stop(self):
+        """Stops the thread which reads the ports."""
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+
+    def add_listener(self, listener):
+        """
+        Add a listener which will be informed about every new block
+        of samples with update_samples(times, values).
+
+        :param listener: Listener
+        :type listener: object
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Removes the given listener.
+
+        :param listener: Listener
+        :type listener: object
+        """
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def get_snapshot(self, timeout=1.0):
+        """Returns the last snapshot of the ports.
+
+        :param timeout: Maximal time to wait for the first snapshot
+        :type timeout: float
+        :returns: Last snapshot
+        :rtype: Snapshot
+        :raises: ValueError
+        """
+        return self.wait_snapshot(None, timeout)
+
+    def wait_snapshot(self, snapshot, timeout=1.0):
+        """Blocks until a snapshot newer than the given one is published.
+
+        :param snapshot: Last known snapshot
+        :type snapshot: Snapshot
+        :param timeout: Maximal time to wait
+        :type timeout: float
+        :returns: Newest snapshot
+        :rtype: Snapshot
+        :raises: ValueError
+        """
+        with self.condition:
+            if self.snapshot is snapshot and self.running:
+                self.condition.wait(timeout)
+            if self.snapshot is None:
+                raise ValueError("The acquisition delivers no values")
+            return self.snapshot
+
+    def _run(self):
+        # Reads the ports until the acquisition is stopped. With a
+        # running scan the new samples of the scan are published,
+        # otherwise all ports are read once per period.
+        ids = tuple(p.id for p in self.card.input_ports)
+        while self.running:
+            sleep(self.card.acquisition_period)
+            try:
+                if self.card.scan_running:
+                    times, values = self.card.read_scan()
+                else:
+                    times, values = self.card.read_all_ports()
+            except Exception, e:
+                self.logger.error(str(e))
+                continue
+            if len(times) == 0:
+                continue
+            snapshot = Snapshot(float(times[-1]), ids, tuple(values[-1]))
+            with self.condition:
+                self.snapshot = snapshot
+                self.condition.notify_all()
+            # listeners can be added or removed by other threads
+            for listener in list(self.listeners):
+                listener.update_samples(times, values)
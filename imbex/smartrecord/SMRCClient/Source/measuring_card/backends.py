@@ -0,0 +1,322 @@
+"""
+.. module: backends
+.. moduleauthor: Marcel Kennert
+"""
+from json import load
+from logging import getLogger
+from os.path import join, isfile
+from time import time
+
+from numpy import arange, interp, cos, pi, clip, rint, uint16, load as nload
+
+from application.configuration import measuring_card_dir, backend_file
+
+#=========================================================================
+# Constants of the Universal Library which are used by the application
+#=========================================================================
+
+BIP5VOLTS = 0
+
+BIP10VOLTS = 1
+
+AUXPORT = 1
+
+# Voltage range (+/-) of the bipolar intervals
+volt_ranges = {BIP5VOLTS: 5., BIP10VOLTS: 10.}
+
+logger = getLogger("Application")
+
+
+class DAQBackend(object):
+    """
+    Base class for the backends of the measuring card. The backend
+    encapsulates the driver calls, so the MeasuringCard and the ports
+    never address the hardware directly.
+    """
+
+    name = "base"
+
+    def open(self, card):
+        """Checks whether the board of the card is available.
+
+        :param card: Measuring card which uses the backend
+        :type card: MeasuringCard
+        :raises: Exception if the board is not available
+        """
+        raise NotImplementedError()
+
+    def read_count(self, board_id, channel, volt_interval):
+        """Reads the raw count of the given analog input channel.
+
+        :param board_id: Id of the board
+        :type board_id: int
+        :param channel: Id of the analog input channel
+        :type channel: int
+        :param volt_interval: Interval of the electrical voltage
+        :type volt_interval: int
+        :returns: Raw count of the analog-digital converter
+        :rtype: int
+        """
+        raise NotImplementedError()
+
+    def to_volt(self, board_id, volt_interval, count):
+        """Converts the raw count to the electrical voltage.
+
+        :param board_id: Id of the board
+        :type board_id: int
+        :param volt_interval: Interval of the electrical voltage
+        :type volt_interval: int
+        :param count: Raw count
+        :type count: int
+        :returns: Electrical voltage
+        :rtype: float
+        """
+        raise NotImplementedError()
+
+    def start_scan(self, board_id, low, high, count, rate, volt_interval,
+                   data):
+        """
+        Starts a continuous background scan of the channels low to high,
+        the raw counts are written interleaved in the circular buffer data.
+
+        :param count: Size of the buffer
+        :type count: int
+        :param rate: Samples per second and channel
+        :type rate: int
+        :param data: Circular buffer of the driver
+        :type data: ndarray
+        :returns: The achieved rate
+        :rtype: int
+        """
+        raise NotImplementedError()
+
+    def get_scan_count(self, board_id):
+        """Returns the total number of samples of the running scan.
+
+        :param board_id: Id of the board
+        :type board_id: int
+        :rtype: int
+        """
+        raise NotImplementedError()
+
+    def stop_scan(self, board_id):
+        """Stops the background scan.
+
+        :param board_id: Id of the board
+        :type board_id: int
+        """
+        raise NotImplementedError()
+
+    def configure_output(self, board_id, port_id):
+        """Configures the given digital port as output.
+
+        :param board_id: Id of the board
+        :type board_id: int
+        :param port_id: Id of the digital port
+        :type port_id: int
+        """
+        raise NotImplementedError()
+
+    def write_output(self, board_id, port_id, value):
+        """Writes the value to the given digital output port.
+
+        :param board_id: Id of the board
+        :type board_id: int
+        :param port_id: Id of the digital port
+        :type port_id: int
+        :param value: Value in bits (0-255)
+        :type value: int
+        """
+        raise NotImplementedError()
+
+
+class ULBackend(DAQBackend):
+    """Backend which addresses the board with the Universal Library."""
+
+    name = "ul"
+
+    def __init__(self):
+        # imported here to make sure that the application can run
+        # with other backends on systems without the library
+        import UniversalLibrary
+        self.ul = UniversalLibrary
+
+    def open(self, card):
+        self.ul.cbAIn(card.id, 0, self.ul.BIPOLAR)
+
+    def read_count(self, board_id, channel, volt_interval):
+        return self.ul.cbAIn(board_id, channel, volt_interval)
+
+    def to_volt(self, board_id, volt_interval, count):
+        return self.ul.cbToEngUnits(board_id, volt_interval, count)
+
+    def start_scan(self, board_id, low, high, count, rate, volt_interval,
+                   data):
+        return self.ul.cbAInScan(board_id, low, high, count, rate,
+                                 volt_interval, data,
+                                 self.ul.BACKGROUND + self.ul.CONTINUOUS)
+
+    def get_scan_count(self, board_id):
+        return self.ul.cbGetStatus(board_id, 0, 0, 0, self.ul.AIFUNCTION)[1]
+
+    def stop_scan(self, board_id):
+        self.ul.cbStopBackground(board_id, self.ul.AIFUNCTION)
+
+    def configure_output(self, board_id, port_id):
+        self.ul.cbDConfigPort(board_id, port_id, self.ul.DIGITALOUT)
+
+    def write_output(self, board_id, port_id, value):
+        self.ul.cbDOut(board_id, port_id, value)
+
+
+class SimulatedBackend(DAQBackend):
+    """
+    Synthetic measuring card to exercise and benchmark the recording
+    without the physical board. The analog inputs either replay the
+    values of a recordings.npy or follow an analytic load signal:
+
+    * ramp: rises from 0 to the amplitude in every period
+    * cycle: load cycles between 0 and the amplitude
+    * replay: values of the given recordings-file
+    """
+
+    name = "simulated"
+
+    def __init__(self, signal="ramp", amplitude=10., period=60.,
+                 source=None, resolution=16):
+        """
+        :param signal: ramp, cycle or replay
+        :type signal: string
+        :param amplitude: Maximal value of the signal in engineering units
+        :type amplitude: float
+        :param period: Duration of a ramp or cycle (in seconds)
+        :type period: float
+        :param source: Path to a recordings.npy for the replay
+        :type source: string
+        :param resolution: Resolution of the converter in bits
+        :type resolution: int
+        """
+        if signal not in ("ramp", "cycle", "replay"):
+            raise ValueError("Unknown signal: {0}".format(signal))
+        if period <= 0:
+            raise ValueError("The period must be positive")
+        self.signal = signal
+        self.amplitude = amplitude
+        self.period = period
+        self.max_count = 2 ** resolution - 1
+        if signal == "replay":
+            self.recordings = nload(source)
+        self.outputs = {}
+        self.scan = None
+        self.start_time = time()
+
+    def open(self, card):
+        self.card = card
+        self.start_time = time()
+
+    #=========================================================================
+    # Signals of the analog inputs
+    #=========================================================================
+
+    def get_values(self, channel, t):
+        """Returns the engineering values of the channel at the times t."""
+        if self.signal == "ramp":
+            return self.amplitude * ((t / self.period) % 1.)
+        elif self.signal == "cycle":
+            return self.amplitude * 0.5 * (1. - cos(2 * pi * t / self.period))
+        times = self.recordings[:, 0]
+        column = self._get_column(channel)
+        duration = max(times[-1], 1.)
+        return interp(t % duration, times, self.recordings[:, column + 1])
+
+    def get_counts(self, channel, volt_interval, t):
+        """Returns the raw counts of the channel at the times t."""
+        values = self.get_values(channel, t)
+        scale, offset = self._get_calibration(channel)
+        volts = (values - offset) / scale
+        vrange = volt_ranges.get(volt_interval, 10.)
+        counts = (volts + vrange) / (2 * vrange) * self.max_count
+        return rint(clip(counts, 0, self.max_count)).astype(uint16)
+
+    def _get_column(self, channel):
+        # Column of the channel in the recordings
+        for i in range(len(self.card.input_ports)):
+            if self.card.input_ports[i].id == channel:
+                return i
+        return 0
+
+    def _get_calibration(self, channel):
+        # Scale and offset of the port, so that the simulated
+        # port delivers the value of the signal
+        for p in self.card.input_ports:
+            if p.id == channel:
+                return p.scale_factor, p.offset
+        return 1., 0.
+
+    #=========================================================================
+    # Methods of the backend
+    #=========================================================================
+
+    def read_count(self, board_id, channel, volt_interval):
+        return int(self.get_counts(channel, volt_interval,
+                                   time() - self.start_time))
+
+    def to_volt(self, board_id, volt_interval, count):
+        vrange = volt_ranges.get(volt_interval, 10.)
+        return count * 2 * vrange / self.max_count - vrange
+
+    def start_scan(self, board_id, low, high, count, rate, volt_interval,
+                   data):
+        self.scan = {"low": low, "channels": high - low + 1, "rate": rate,
+                     "volt_interval": volt_interval, "data": data,
+                     "start": time(), "count": 0}
+        return rate
+
+    def get_scan_count(self, board_id):
+        # Fills the driver buffer with the samples which would be
+        # acquired by the hardware until now
+        scan = self.scan
+        channels = scan["channels"]
+        data = scan["data"]
+        first = scan["count"] // channels
+        last = int((time() - scan["start"]) * scan["rate"])
+        if last > first:
+            t = scan["start"] - self.start_time + \
+                arange(first, last) / float(scan["rate"])
+            for c in range(channels):
+                counts = self.get_counts(scan["low"] + c,
+                                         scan["volt_interval"], t)
+                index = (arange(first, last) * channels + c) % len(data)
+                data[index] = counts
+            scan["count"] = last * channels
+        return scan["count"]
+
+    def stop_scan(self, board_id):
+        self.scan = None
+
+    def configure_output(self, board_id, port_id):
+        self.outputs[port_id] = 0
+
+    def write_output(self, board_id, port_id, value):
+        self.outputs[port_id] = value
+
+
+def create_backend():
+    """
+    Creates the backend of the measuring card. The backend can be
+    selected in the configuration-file of the measuring card, by
+    default the Universal Library is used.
+
+    :returns: The configured backend
+    :rtype: DAQBackend
+    """
+    fpath = join(measuring_card_dir, backend_file)
+    if not isfile(fpath):
+        return ULBackend()
+    with open(fpath, 'r') as f:
+        data = load(f)
+    name = data.pop("name", ULBackend.name)
+    logger.debug("Use the backend {0} [MeasuringCard]".format(name))
+    if name == SimulatedBackend.name:
+        return SimulatedBackend(**data)
+    return ULBackend()
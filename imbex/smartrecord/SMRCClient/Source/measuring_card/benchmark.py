@@ -0,0 +1,68 @@
+"""
+.. module: benchmark
+.. moduleauthor: Marcel Kennert
+
+Measures the throughput and the latency of the acquisition with the
+simulated measuring card. Start the module in the Source-folder with
+``python -m measuring_card.benchmark``.
+"""
+from time import time
+
+from numpy import array
+
+from basic_modules.basic_methods import monotonic
+
+from measuring_card.backends import SimulatedBackend
+from measuring_card.card import MeasuringCard
+from measuring_card.ports import PortAI
+
+
+def create_card(n_ports=4, signal="cycle"):
+    """Creates a measuring card with the simulated backend.
+
+    :param n_ports: Number of analog input ports
+    :type n_ports: int
+    :param signal: Signal of the simulated ports
+    :type signal: string
+    :returns: Measuring card
+    :rtype: MeasuringCard
+    """
+    card = MeasuringCard(SimulatedBackend(signal=signal, period=10.))
+    for i in range(n_ports):
+        card.append_port(PortAI(card, i, 1., 0., "Port {0}".format(i)))
+    return card
+
+
+def benchmark_record_all_ports(card, n=1000):
+    """Returns the number of record_all_ports calls per second."""
+    start = time()
+    for _ in range(n):
+        card.record_all_ports()
+    return n / (time() - start)
+
+
+def benchmark_scan(card, duration=5.):
+    """
+    Runs a buffered scan and returns the achieved sample rate and the
+    mean and maximal latency between a sample and its availability.
+    """
+    card.scan_mode = True
+    card.start_acquisition()
+    count, latencies = 0, []
+    end = time() + duration
+    while time() < end:
+        if card.scan_buffer.wait(count, 1.):
+            times, _, count = card.get_samples(count)
+            latencies.append(monotonic() - times[-1])
+    card.stop_acquisition()
+    latencies = array(latencies)
+    return count / duration, latencies.mean(), latencies.max()
+
+
+if __name__ == '__main__':
+    card = create_card()
+    print "record_all_ports: {0:.0f} calls/s".format(
+        benchmark_record_all_ports(card))
+    rate, mean_latency, max_latency = benchmark_scan(card)
+    print "scan: {0:.0f} rows/s, latency mean {1:.1f} ms, max {2:.1f} ms"\
+        .format(rate, mean_latency * 1e3, max_latency * 1e3)
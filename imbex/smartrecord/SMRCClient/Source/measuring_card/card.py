@@ -7,13 +7,18 @@ from json import dump, load
 from logging import getLogger
 from os.path import join
 
-from UniversalLibrary import cbAIn, BIPOLAR, BIP10VOLTS
-from traits.api import HasTraits, Int, List, Button, Bool
+from numpy import zeros, arange, uint16, array
+from traits.api import HasTraits, Int, List, Button, Bool, Float
 from traitsui.api import View, Item, UItem, ListEditor, HGroup, spring, VGroup
 
 from application.configuration import experiment_dir, measuring_card_file
+from basic_modules.basic_methods import monotonic
+from measuring_card.acquisition import Acquisition, Snapshot
+from measuring_card.backends import BIP10VOLTS, create_backend
 from measuring_card.ports import InputPort, OutputPort, DialogPortAI,\
     DialogPortDO, PortDO, PortAI
+from measuring_card.scan import RingBuffer
+from measuring_card.trigger import TriggerScheduler
 
 
 class MeasuringCard(HasTraits):
@@ -31,12 +36,45 @@ class MeasuringCard(HasTraits):
 
     output_ports = List(OutputPort)
 
+    # Resolution of the analog-digital converter in bits
+    ad_resolution = Int(16)
+
+    #=========================================================================
+    # Properties of the buffered scan
+    #=========================================================================
+
+    # True if the input ports should read by a hardware-timed scan
+    scan_mode = Bool(False)
+
+    # Samples per second and port
+    scan_rate = Int(1000)
+
+    # Time (in seconds) of the samples which are kept in the ring buffer
+    scan_buffer_time = Float(60.)
+
+    scan_running = Bool(False)
+
+    # Time (in seconds) between two reads of the acquisition
+    acquisition_period = Float(0.01)
+
     logger = getLogger("Application")
 
-    def __init__(self):
+    def __init__(self, backend=None):
+        """
+        :param backend: Backend to address the board. If no backend is \
+            given, the configured backend will be used.
+        :type backend: DAQBackend
+        """
+        self.backend = backend if backend is not None else create_backend()
         self.dialog_portai = DialogPortAI(self)
         self.dialog_portdo = DialogPortDO(self)
-        cbAIn(self.id, 0, BIPOLAR)
+        # tables which map every raw count to the voltage,
+        # one table per volt_interval
+        self.volt_tables = {}
+        self.update_calibration()
+        self.acquisition = Acquisition(self)
+        self.trigger_scheduler = TriggerScheduler()
+        self.backend.open(self)
 
     def append_port(self, port):
         """Appends a port to the measuring card.
@@ -109,14 +147,13 @@ class MeasuringCard(HasTraits):
         """
         for port in self.output_ports:
             if port.id == port_id:
-                if reset:
-                    return port.trigger(reset_time)
-                else:
-                    return port.trigger()
+                self.trigger_scheduler.trigger([port], reset, reset_time)
+                return True
         raise ValueError("The given id not exists")
 
     def trigger_all_ports(self, reset=True, reset_time=0.1):
-        """Trigger a digital signal to all ports.
+        """Trigger a digital signal to all ports at once. The ports will
+        reset in the background, the method does not block.
 
         :param reset: True if the value should reset by a given time
         :type reset: bool
@@ -127,11 +164,7 @@ class MeasuringCard(HasTraits):
         :raises: ValueError
         """
         self.logger.debug("Trigger_all_ports [MeasuringCard]")
-        for port in self.output_ports:
-            if reset:
-                return port.trigger(reset_time)
-            else:
-                return port.trigger()
+        self.trigger_scheduler.trigger(self.output_ports, reset, reset_time)
         return True
 
     #=========================================================================
@@ -152,7 +185,8 @@ class MeasuringCard(HasTraits):
         return False
 
     def record_port(self, port_id):
-        """Records the value of the port by the given port-id.
+        """Records the value of the port by the given port-id. While the
+        acquisition is running, the value is taken from the last snapshot.
 
         :param port_id: Id of the port.
         :type port_id: int
@@ -160,6 +194,8 @@ class MeasuringCard(HasTraits):
         :rtype: List
         :raises: ValueError
         """
+        if self.acquisition.running:
+            return (port_id, self.get_snapshot().get_value(port_id))
         for port in self.input_ports:
             pid = port.id
             if port.id == port_id:
@@ -168,16 +204,198 @@ class MeasuringCard(HasTraits):
         raise ValueError("The given id not exists.")
 
     def record_all_ports(self):
-        """Records the value of all ports.
+        """Records the value of all ports. While the acquisition
+        is running, the values are taken from the last snapshot.
 
         :returns: List that contains  tuples like (port_id, value)
         :rtype: List
         """
-        res = []
-        for port in self.input_ports:
-            value = port.record_port(self.volt_interval)
-            res.append((port.id, value))
-        return res
+        return self.record_snapshot().items()
+
+    def record_snapshot(self):
+        """Records the values of all ports with their sampling time. While
+        the acquisition is running, the last snapshot is returned.
+
+        :returns: Values of all input ports at the same instant
+        :rtype: Snapshot
+        """
+        if self.acquisition.running:
+            return self.get_snapshot()
+        times, values = self.read_all_ports()
+        return Snapshot(float(times[0]),
+                        tuple(p.id for p in self.input_ports),
+                        tuple(values[0]))
+
+    def read_all_ports(self):
+        """Reads all input ports once from the board.
+
+        :returns: (timestamps, values) with one row for all input ports
+        :rtype: (ndarray, ndarray)
+        """
+        counts = array([[self.backend.read_count(self.id, p.id,
+                                                 self.volt_interval)
+                         for p in self.input_ports]], dtype=uint16)
+        return array([monotonic()]), self.convert_counts(counts)
+
+    #=========================================================================
+    # Methods for the acquisition
+    #=========================================================================
+
+    def start_acquisition(self):
+        """
+        Starts the acquisition, which reads the input ports in a own
+        thread. In scan_mode the ports are read by a buffered scan.
+        """
+        if self.scan_mode:
+            self.start_scan()
+        self.acquisition.start()
+
+    def stop_acquisition(self):
+        """Stops the acquisition and the buffered scan."""
+        self.acquisition.stop()
+        self.stop_scan()
+
+    def get_snapshot(self):
+        """Returns the last snapshot of the acquisition.
+
+        :returns: Values of all input ports at the same instant
+        :rtype: Snapshot
+        :raises: ValueError
+        """
+        return self.acquisition.get_snapshot()
+
+    #=========================================================================
+    # Methods for the calibration of the input ports
+    #=========================================================================
+
+    def update_calibration(self):
+        """Updates the scale and offset vectors of the input ports."""
+        self.scale_factors = array([p.scale_factor for p in self.input_ports])
+        self.offsets = array([p.offset for p in self.input_ports])
+
+    def _input_ports_changed(self):
+        # the vectors must follow the order of the input ports
+        self.update_calibration()
+
+    def _input_ports_items_changed(self):
+        # edited ports are removed and appended again
+        self.update_calibration()
+
+    def get_volt_table(self, volt_interval):
+        """
+        Returns the table which maps every raw count of the
+        analog-digital converter to the electrical voltage. The table
+        is computed once for every volt_interval.
+
+        :param volt_interval: Interval of the electrical voltage
+        :type volt_interval: int
+        :returns: Voltage of every raw count
+        :rtype: ndarray
+        """
+        table = self.volt_tables.get(volt_interval)
+        if table is None:
+            table = array([self.backend.to_volt(self.id, volt_interval, c)
+                           for c in range(2 ** self.ad_resolution)])
+            self.volt_tables[volt_interval] = table
+        return table
+
+    def convert_counts(self, counts):
+        """
+        Transforms raw counts in the values of the input ports with
+        the scale factors and the offsets of the ports.
+
+        :param counts: Raw counts with the shape (samples, input ports) \
+            or (input ports,)
+        :type counts: ndarray
+        :returns: Values with the same shape as the counts
+        :rtype: ndarray
+        """
+        volts = self.get_volt_table(self.volt_interval)[counts]
+        return volts * self.scale_factors + self.offsets
+
+    #=========================================================================
+    # Methods for the buffered scan
+    #=========================================================================
+
+    def start_scan(self):
+        """
+        Starts a hardware-timed scan of all input ports in the background.
+        The acquisition copies the samples continuously in a ring buffer,
+        so that the ports are read channel-aligned with the scan_rate.
+
+        :raises: ValueError
+        """
+        if self.scan_running:
+            return
+        if len(self.input_ports) < 1:
+            raise ValueError("Define a input port")
+        self.logger.debug("Start scan [MeasuringCard]")
+        ids = [p.id for p in self.input_ports]
+        self.low_channel, self.high_channel = min(ids), max(ids)
+        self.channels = self.high_channel - self.low_channel + 1
+        # column of every input port in a scan of the board
+        self.scan_columns = [pid - self.low_channel for pid in ids]
+        # the driver buffer holds one second of samples
+        count = self.scan_rate * self.channels
+        self.scan_data = zeros(count, dtype=uint16)
+        self.scan_rate = self.backend.start_scan(
+            self.id, self.low_channel, self.high_channel, count,
+            self.scan_rate, self.volt_interval, self.scan_data)
+        self.scan_start = monotonic()
+        capacity = int(self.scan_buffer_time * self.scan_rate)
+        self.scan_buffer = RingBuffer(capacity, len(ids))
+        self.scan_read = 0
+        self.scan_running = True
+
+    def stop_scan(self):
+        """Stops the buffered scan."""
+        if not self.scan_running:
+            return
+        self.logger.debug("Stop scan [MeasuringCard]")
+        self.scan_running = False
+        self.backend.stop_scan(self.id)
+
+    def get_samples(self, count=0):
+        """Returns all samples of the scan after the given count.
+
+        :param count: Number of samples which are already known
+        :type count: int
+        :returns: (timestamps, values, new number of samples), the values \
+            have the shape (samples, input ports)
+        :rtype: (ndarray, ndarray, int)
+        """
+        return self.scan_buffer.get_since(count)
+
+    def read_scan(self):
+        """
+        Copies the new samples of the driver buffer in the ring buffer.
+        The timestamps are computed by the position of the sample in
+        the scan, so all ports of a row share the same timestamp.
+
+        :returns: (timestamps, values) of the new samples
+        :rtype: (ndarray, ndarray)
+        """
+        size = len(self.scan_data)
+        read = self.scan_read
+        new = self.backend.get_scan_count(self.id) - read
+        new -= new % self.channels
+        if new <= 0:
+            return array([]), zeros((0, len(self.scan_columns)))
+        if new > size:
+            self.logger.error("Scan overrun, {0} samples are lost"
+                              .format(new - size))
+            read += new - size
+            new = size
+        index = arange(read, read + new) % size
+        block = self.scan_data[index].reshape(-1, self.channels)
+        block = block[:, self.scan_columns]
+        first = read // self.channels
+        times = self.scan_start + \
+            (first + arange(len(block))) / float(self.scan_rate)
+        values = self.convert_counts(block)
+        self.scan_buffer.append(times, values)
+        self.scan_read = read + new
+        return times, values
 
     #=========================================================================
     # Methods to save and load the measuring card
@@ -188,6 +406,8 @@ class MeasuringCard(HasTraits):
         self.logger.debug("Save measuring card [MeasuringCard]")
         data = {}
         data["volt_interval"] = self.volt_interval
+        data["scan_mode"] = self.scan_mode
+        data["scan_rate"] = self.scan_rate
         data["ports"] = []
         for port in self.input_ports + self.output_ports:
             data["ports"].append(port.save())
@@ -203,6 +423,8 @@ class MeasuringCard(HasTraits):
         with open(join(experiment_dir, measuring_card_file), 'r') as f:
             data = load(f)
         self.volt_interval = data["volt_interval"]
+        self.scan_mode = data.get("scan_mode", False)
+        self.scan_rate = data.get("scan_rate", 1000)
         ports = data["ports"]
         for port in ports:
             class_name = port['class_name']
@@ -269,10 +491,9 @@ class MeasuringCard(HasTraits):
         :rtype: string
         """
         res = ""
+        values = dict(self.record_all_ports())
         for p in self.input_ports:
-            pid, pname = p.id, p.name
-            value = self.record_port(pid)[1]
-            res += "{0}: {1:.3f}; ".format(pname, value)
+            res += "{0}: {1:.3f}; ".format(p.name, values[p.id])
         return res
 
     #=========================================================================
@@ -317,6 +538,12 @@ class MeasuringCard(HasTraits):
                        Item("add_portdo", show_label=False)),
                 label="Output-Ports"
             ),
+            VGroup(
+                Item("scan_mode", label="Buffered scan"),
+                Item("scan_rate", label="Rate [Hz]",
+                     enabled_when="scan_mode"),
+                label="Scan"
+            ),
             layout="normal",
             enabled_when="not started"
         ),
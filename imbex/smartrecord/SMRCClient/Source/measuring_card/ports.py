@@ -9,8 +9,8 @@ from traits.api import \
 from traitsui.api import View, Item, VGroup, HGroup, spring, UItem, Group
 from traitsui.menu import Action, CancelButton
 
-import UniversalLibrary as UL
 from basic_modules.basic_classes import Combobox, RunThread
+from measuring_card.backends import BIP10VOLTS, AUXPORT
 
 
 class Port(HasTraits):
@@ -158,7 +158,7 @@ class PortAI(InputPort):
     # Methods to handle the port
     #=========================================================================
 
-    def record_port(self, volt_interval=UL.BIP10VOLTS):
+    def record_port(self, volt_interval=BIP10VOLTS):
         """Reads the electrical voltage and transforms \
            the value with the scale factor and the offset.
 
@@ -167,8 +167,22 @@ class PortAI(InputPort):
         :returns: The value of the machine
         :rtype: float
         """
-        data = UL.cbAIn(self.board.id, self.id, volt_interval)
-        volt = UL.cbToEngUnits(self.board.id, volt_interval, data)
+        data = self.board.backend.read_count(self.board.id, self.id,
+                                             volt_interval)
+        return self.convert(data, volt_interval)
+
+    def convert(self, data, volt_interval=BIP10VOLTS):
+        """Transforms the given raw count with the scale factor \
+           and the offset.
+
+        :param data: Raw count of the analog-digital converter
+        :type data: int
+        :param volt_interval: Interval of the electrical voltage of the machine
+        :type volt_interval: int.
+        :returns: The value of the machine
+        :rtype: float
+        """
+        volt = self.board.get_volt_table(volt_interval)[data]
         return self.scale_factor * volt + self.offset
 
     #=========================================================================
@@ -367,15 +381,16 @@ class PortDO(OutputPort):
         super(PortDO, self).__init__(board, port_id, name)
         self.edit_dialog = edit_dialog
         self.value = 0
-        UL.cbDConfigPort(board.id, self.id, UL.DIGITALOUT)
-        UL.cbDOut(self.board.id, self.id, self.value)
+        board.backend.configure_output(board.id, self.id)
+        board.backend.write_output(board.id, self.id, self.value)
 
     #=========================================================================
     # Methods to handle the port
     #=========================================================================
 
     def trigger(self, reset_time=-1):
-        """Triggers a digital signal.
+        """Triggers a digital signal. The reset happens in the background,
+        so the method returns directly after the signal was sent.
 
         :param reset_time: Time (in seconds) to pass until reset the value. \
             If the reset_time will not set, the trigger will change \
@@ -387,16 +402,26 @@ class PortDO(OutputPort):
         """
         if reset_time < -1:
             raise ValueError("Invalid value: Value must positive")
-        value = 0 if self.value == 255 else 255
-        if reset_time != -1:
-            UL.cbDOut(self.board.id, self.id, value)
-            sleep(reset_time)
-            UL.cbDOut(self.board.id, self.id, self.value)
-        else:
-            UL.cbDOut(self.board.id, self.id, value)
-            self.value = value
+        self.board.trigger_scheduler.trigger([self], reset_time != -1,
+                                             reset_time)
         return True
 
+    def get_trigger_value(self):
+        """Returns the value which will be sent by a trigger.
+
+        :returns: Volt value in bits (0-255)
+        :rtype: int
+        """
+        return 0 if self.value == 255 else 255
+
+    def write(self, value):
+        """Writes the given value to the port.
+
+        :param value: Volt value in bits (0-255)
+        :type value: int
+        """
+        self.board.backend.write_output(self.board.id, self.id, value)
+
     #=========================================================================
     # Methods to save and load the port
     #=========================================================================
@@ -459,7 +484,7 @@ class DialogPortDO(DialogPort):
 
     def __init__(self, measuring_card):
         self.measuring_card = measuring_card
-        self.id.add_item("Auxport", UL.AUXPORT)
+        self.id.add_item("Auxport", AUXPORT)
 
     #=========================================================================
     # Methods to handle the dialog with other classes
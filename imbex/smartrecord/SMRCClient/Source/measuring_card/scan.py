@@ -0,0 +1,108 @@
+"""
+.. module: scan
+.. moduleauthor: Marcel Kennert
+"""
+from threading import Condition
+
+from numpy import zeros, arange
+
+
+class RingBuffer(object):
+    """
+    Preallocated ring buffer for the samples of a buffered scan. Every row
+    contains the values of all scanned ports at the same instant, the
+    timestamps of the rows are kept in a separate column. When the buffer
+    is full the oldest rows will be overwritten.
+    """
+
+    def __init__(self, capacity, channels):
+        """
+        :param capacity: Maximal number of rows in the buffer
+        :type capacity: int
+        :param channels: Number of values per row
+        :type channels: int
+        """
+        if capacity < 1:
+            raise ValueError("The capacity must be positive")
+        self.capacity = capacity
+        self.channels = channels
+        self.times = zeros(capacity)
+        self.values = zeros((capacity, channels))
+        # total number of rows which were appended since the start
+        self.count = 0
+        self.condition = Condition()
+
+    def append(self, times, values):
+        """Appends a block of rows to the buffer.
+
+        :param times: Timestamps of the rows
+        :type times: ndarray
+        :param values: Values with the shape (rows, channels)
+        :type values: ndarray
+        """
+        n = len(times)
+        if n == 0:
+            return
+        # only the last rows fit in the buffer
+        skipped = max(n - self.capacity, 0)
+        times, values = times[skipped:], values[skipped:]
+        with self.condition:
+            start = (self.count + skipped) % self.capacity
+            end = start + n - skipped
+            if end <= self.capacity:
+                self.times[start:end] = times
+                self.values[start:end] = values
+            else:
+                k = self.capacity - start
+                self.times[start:] = times[:k]
+                self.values[start:] = values[:k]
+                self.times[:end - self.capacity] = times[k:]
+                self.values[:end - self.capacity] = values[k:]
+            self.count += n
+            self.condition.notify_all()
+
+    def wait(self, count, timeout=None):
+        """Blocks until the buffer contains more rows than the given count.
+
+        :param count: Total number of rows which are already known
+        :type count: int
+        :param timeout: Maximal time to wait (in seconds)
+        :type timeout: float
+        :returns: True if new rows are available, False otherwise
+        :rtype: bool
+        """
+        with self.condition:
+            if self.count <= count:
+                self.condition.wait(timeout)
+            return self.count > count
+
+    def latest(self, timeout=1.0):
+        """Returns the last row of the buffer.
+
+        :param timeout: Maximal time to wait for the first row (in seconds)
+        :type timeout: float
+        :returns: (timestamp, values)
+        :rtype: (float, ndarray)
+        :raises: ValueError
+        """
+        if not self.wait(0, timeout):
+            raise ValueError("The scan delivers no samples")
+        with self.condition:
+            i = (self.count - 1) % self.capacity
+            return self.times[i], self.values[i].copy()
+
+    def get_since(self, count):
+        """Returns all rows which were appended after the given count.
+
+        If the buffer was overwritten in the meantime, only the rows
+        which are still in the buffer will be returned.
+
+        :param count: Total number of rows which are already known
+        :type count: int
+        :returns: (timestamps, values, new total count)
+        :rtype: (ndarray, ndarray, int)
+        """
+        with self.condition:
+            first = max(count, self.count - self.capacity)
+            index = arange(first, self.count) % self.capacity
+            return self.times[index], self.values[index], self.count
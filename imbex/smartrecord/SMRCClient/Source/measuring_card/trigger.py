@@ -0,0 +1,136 @@
+"""
+.. module: trigger
+.. moduleauthor: Marcel Kennert
+"""
+from collections import deque
+from logging import getLogger
+from threading import Lock, Timer
+from time import time
+
+
+class TriggerEvent(object):
+    """Timing of one trigger of the output ports."""
+
+    def __init__(self, requested, latency, skew, reset_time):
+        """
+        :param requested: Time when the trigger was requested
+        :type requested: float
+        :param latency: Time (in seconds) until the last port was raised
+        :type latency: float
+        :param skew: Time (in seconds) between the first and the last port
+        :type skew: float
+        :param reset_time: Planned time until the reset, -1 without reset
+        :type reset_time: float
+        """
+        self.requested = requested
+        self.latency = latency
+        self.skew = skew
+        self.reset_time = reset_time
+        # achieved time between the request and the reset
+        self.reset_delay = None
+
+    def __str__(self, *args, **kwargs):
+        return "Trigger-Event:" + str(self.__dict__)
+
+
+class TriggerScheduler(object):
+    """
+    Triggers the output ports of the measuring card without blocking
+    the caller. All ports are raised directly one after another and
+    reset together by a timer. The timing of every trigger is saved
+    as a TriggerEvent.
+    """
+
+    logger = getLogger("Application")
+
+    def __init__(self, max_events=10000):
+        """
+        :param max_events: Number of trigger events which are kept
+        :type max_events: int
+        """
+        self.lock = Lock()
+        self.events = deque(maxlen=max_events)
+        self.timer = None
+        self.pending = []
+        self.pending_event = None
+
+    def trigger(self, ports, reset=True, reset_time=0.1):
+        """Raises the given output ports.
+
+        :param ports: Output ports which should trigger
+        :type ports: List(PortDO)
+        :param reset: True if the ports should reset after the reset_time,\
+            otherwise the ports keep the new value
+        :type reset: bool
+        :param reset_time: Time (in seconds) until the ports will reset
+        :type reset_time: float
+        :returns: The trigger event
+        :rtype: TriggerEvent
+        :raises: ValueError
+        """
+        if reset and reset_time < 0:
+            raise ValueError("Invalid value: Value must positive")
+        requested = time()
+        with self.lock:
+            # a running reset must happen before the next trigger
+            self._cancel_timer()
+            written = []
+            for port in ports:
+                port.write(port.get_trigger_value())
+                written.append(time())
+            if not reset:
+                for port in ports:
+                    port.value = port.get_trigger_value()
+            first = written[0] if written else requested
+            last = written[-1] if written else requested
+            event = TriggerEvent(requested, last - requested, last - first,
+                                 reset_time if reset else -1)
+            self.events.append(event)
+            if reset:
+                self.pending = list(ports)
+                self.pending_event = event
+                self.timer = Timer(reset_time, self._reset, [event])
+                self.timer.daemon = True
+                self.timer.start()
+        self.logger.debug("Trigger latency {0:.6f}s, skew {1:.6f}s"
+                          .format(event.latency, event.skew))
+        return event
+
+    def cancel(self):
+        """Resets all raised ports immediately."""
+        with self.lock:
+            self._cancel_timer()
+
+    def get_events(self):
+        """Returns the saved trigger events.
+
+        :rtype: List(TriggerEvent)
+        """
+        with self.lock:
+            return list(self.events)
+
+    def _cancel_timer(self):
+        # Stops the timer and resets the pending ports. The lock
+        # must be acquired by the caller.
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+            self._write_reset(self.pending_event)
+
+    def _reset(self, event):
+        # Resets the ports after the reset_time has passed
+        with self.lock:
+            # the ports were already reset by a later trigger
+            if self.pending_event is not event:
+                return
+            self.timer = None
+            self._write_reset(event)
+
+    def _write_reset(self, event):
+        # Writes the original values of the pending ports
+        for port in self.pending:
+            port.write(port.value)
+        self.pending = []
+        self.pending_event = None
+        if event is not None:
+            event.reset_delay = time() - event.requested